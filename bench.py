@@ -0,0 +1,346 @@
+"""Benchmark suite for the gym MCP server.
+
+Starts the local upstream stand-in (mock_upstream.py), then for each scenario
+spawns a fresh gym.py over stdio, drives its tools through a real MCP client
+session and reports latency percentiles, throughput, server RSS and upstream
+call counts as JSON, so results can be compared across commits:
+
+    python bench.py --requests 200 --concurrency 20 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = ("cold_cache", "warm_cache", "bursty_duplicates", "error_storm")
+
+# Share of calls going to each tool
+TOOL_MIX = {
+    "generateWorkoutPlan": 0.3,
+    "customWorkoutPlan": 0.1,
+    "nutritionAdvice": 0.2,
+    "exerciseDetail": 0.4
+}
+
+GOALS = ["weight_loss", "muscle_gain", "endurance", "general_fitness"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+PREFERENCES = ["cardio", "strength_training", "flexibility", "mixed"]
+CONDITIONS = ["knee_injury", "back_pain", "asthma"]
+ACTIVITY_LEVELS = ["sedentary", "light", "moderate", "active", "very_active"]
+DIET = ["vegetarian", "vegan", "gluten_free", "dairy_free"]
+EXERCISE_NAMES = ["squats", "push-ups", "deadlift", "bench press", "lunges", "plank",
+                  "pull-ups", "burpees", "rowing", "mountain climbers", "glute bridges"]
+
+
+def pick_tool(rng: random.Random) -> str:
+    return rng.choices(list(TOOL_MIX), weights=list(TOOL_MIX.values()))[0]
+
+
+def realistic_arguments(tool: str, rng: random.Random) -> dict:
+    """Arguments drawn from a distribution resembling real member requests"""
+    if tool in ("generateWorkoutPlan", "customWorkoutPlan"):
+        arguments = {
+            "goal": rng.choice(GOALS),
+            "fitness_level": rng.choices(LEVELS, weights=[0.6, 0.3, 0.1])[0],
+            "preferences": rng.sample(PREFERENCES, rng.randint(1, 2)),
+            "health_conditions": rng.sample(CONDITIONS, rng.choices([0, 1], weights=[0.8, 0.2])[0]),
+            "days_per_week": rng.choices([3, 4, 5], weights=[0.5, 0.3, 0.2])[0],
+            "session_duration": rng.choice([30, 45, 60]),
+            "plan_duration_weeks": rng.choice([4, 8, 12])
+        }
+        if tool == "customWorkoutPlan":
+            arguments["custom_goals"] = rng.sample(["marathon", "5k", "flexibility", "posture"], 1)
+        return arguments
+
+    if tool == "nutritionAdvice":
+        weight = round(rng.gauss(78, 14), 0)
+        return {
+            "goal": rng.choice(["weight_loss", "weight_gain", "maintain_weight"]),
+            "dietary_restrictions": rng.sample(DIET, rng.choices([0, 1], weights=[0.7, 0.3])[0]),
+            "current_weight": min(250.0, max(45.0, weight)),
+            "target_weight": min(250.0, max(45.0, weight + rng.choice([-10, -5, 0, 5]))),
+            "daily_activity_level": rng.choice(ACTIVITY_LEVELS)
+        }
+
+    return {"exercise_name": rng.choice(EXERCISE_NAMES)}
+
+
+def unique_arguments(tool: str, index: int) -> dict:
+    """Arguments that are distinct for every index, so no call can hit the cache"""
+    if tool in ("generateWorkoutPlan", "customWorkoutPlan"):
+        return {
+            "session_duration": 15 + index % 166,
+            "days_per_week": 1 + (index // 166) % 7,
+            "plan_duration_weeks": 1 + (index // 1162) % 52
+        }
+    if tool == "nutritionAdvice":
+        return {"current_weight": 30 + (index % 2700) / 10}
+    return {"exercise_name": f"exercise-{index}"}
+
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def server_rss_kb() -> Optional[int]:
+    """Resident memory of the gym.py child process (Linux only)"""
+    for pid in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().split(b"\0")
+            with open(f"/proc/{pid}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        is_gym = any(arg.endswith(b"gym.py") for arg in cmdline)
+        if int(status["PPid"]) == os.getpid() and is_gym and "VmRSS" in status:
+            return int(status["VmRSS"].split()[0])
+    return None
+
+
+class Recorder:
+    """Collects per-call latency and outcome for one scenario"""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors: dict[str, int] = {}
+
+    async def call(self, session: ClientSession, tool: str, arguments: dict) -> None:
+        started = time.perf_counter()
+        result = await session.call_tool(tool, arguments)
+        self.latencies.append(time.perf_counter() - started)
+
+        status = "tool_error" if result.isError else None
+        if not status and result.content:
+            try:
+                status = json.loads(result.content[0].text).get("status")
+            except (ValueError, AttributeError):
+                pass
+        if status in ("tool_error", "validation_error", "api_error"):
+            self.errors[status] = self.errors.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_s": round(len(self.latencies) / elapsed, 2) if elapsed else None,
+            "latency_ms": {
+                name: round(value * 1000, 2) if value is not None else None
+                for name, value in (
+                    ("p50", percentile(self.latencies, 50)),
+                    ("p95", percentile(self.latencies, 95)),
+                    ("p99", percentile(self.latencies, 99)),
+                    ("max", max(self.latencies) if self.latencies else None)
+                )
+            }
+        }
+
+
+async def run_bounded(calls: list, concurrency: int) -> None:
+    """Await the given coroutine factories with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(call):
+        async with semaphore:
+            await call()
+
+    await asyncio.gather(*(bounded(call) for call in calls))
+
+
+@asynccontextmanager
+async def gym_session(base_url: str, server_env: dict) -> AsyncIterator[ClientSession]:
+    """Spawn gym.py over stdio against the given upstream and open an MCP session"""
+    env = {**os.environ, "BASE_URL": base_url,
+           "RAPID_APIKEY": os.getenv("RAPID_APIKEY", "bench"), **server_env}
+    params = StdioServerParameters(
+        command=sys.executable, args=[os.path.join(ROOT, "gym.py")], env=env, cwd=ROOT)
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+
+
+@asynccontextmanager
+async def http_session(url: str) -> AsyncIterator[ClientSession]:
+    """Open an MCP session to a gym.py already serving the streamable-http transport"""
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+async def run_scenario(name: str, args: argparse.Namespace, mock: httpx.AsyncClient,
+                       server_env: dict) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+
+    await mock.post("/reset")
+    await mock.post("/config", json={
+        "error_rate": args.error_rate if name == "error_storm" else 0.0,
+        "error_statuses": [503, 429, 500]
+    })
+
+    async with gym_session(str(mock.base_url), server_env) as session:
+        if name == "cold_cache":
+            calls = []
+            for index in range(args.requests):
+                tool = pick_tool(rng)
+                arguments = {**realistic_arguments(tool, rng), **unique_arguments(tool, index)}
+                calls.append(lambda t=tool, a=arguments: recorder.call(session, t, a))
+            started = time.perf_counter()
+            await run_bounded(calls, args.concurrency)
+
+        elif name == "warm_cache":
+            distinct = []
+            for _ in range(args.distinct):
+                tool = pick_tool(rng)
+                distinct.append((tool, realistic_arguments(tool, rng)))
+            # Prime the cache; not part of the measurement
+            for tool, arguments in distinct:
+                await session.call_tool(tool, arguments)
+            # Count only the upstream calls made during the measured phase
+            await mock.post("/reset")
+            calls = [lambda c=rng.choice(distinct): recorder.call(session, *c)
+                     for _ in range(args.requests)]
+            started = time.perf_counter()
+            await run_bounded(calls, args.concurrency)
+
+        elif name == "bursty_duplicates":
+            started = time.perf_counter()
+            for burst in range(max(1, args.requests // args.burst_size)):
+                tool = pick_tool(rng)
+                arguments = {**realistic_arguments(tool, rng), **unique_arguments(tool, burst)}
+                await asyncio.gather(*(recorder.call(session, tool, arguments)
+                                       for _ in range(args.burst_size)))
+
+        else:
+            calls = []
+            for index in range(args.requests):
+                tool = pick_tool(rng)
+                arguments = {**realistic_arguments(tool, rng), **unique_arguments(tool, index)}
+                calls.append(lambda t=tool, a=arguments: recorder.call(session, t, a))
+            started = time.perf_counter()
+            await run_bounded(calls, args.concurrency)
+
+        elapsed = time.perf_counter() - started
+        rss_kb = server_rss_kb()
+
+    upstream = (await mock.get("/stats")).json()
+    return {
+        **recorder.summary(elapsed),
+        "server_rss_kb": rss_kb,
+        "upstream_calls": sum(upstream["calls"].values()),
+        "upstream_calls_by_endpoint": upstream["calls"],
+        "upstream_errors": sum(upstream["errors"].values())
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_until_ready(mock: httpx.AsyncClient, process: subprocess.Popen) -> None:
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError("mock_upstream.py exited during startup")
+        try:
+            await mock.get("/stats")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("mock_upstream.py did not start")
+
+
+@asynccontextmanager
+async def mock_upstream(port: int, latency_ms: float, plan_latency_ms: float,
+                        seed: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Run mock_upstream.py for the duration of the block and yield an admin client for it"""
+    process = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "mock_upstream.py"),
+        "--port", str(port),
+        "--latency-ms", str(latency_ms),
+        "--plan-latency-ms", str(plan_latency_ms),
+        "--seed", str(seed)
+    ])
+
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as mock:
+            await wait_until_ready(mock, process)
+            yield mock
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def main(args: argparse.Namespace) -> dict:
+    server_env = dict(item.split("=", 1) for item in args.server_env)
+
+    async with mock_upstream(args.mock_port, args.latency_ms, args.plan_latency_ms, args.seed) as mock:
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = await run_scenario(name, args, mock, server_env)
+            latency = results[name]["latency_ms"]
+            print(f"  p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                  f"rps={results[name]['requests_per_s']} "
+                  f"upstream_calls={results[name]['upstream_calls']}", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": results
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the gym MCP server against the local mock upstream")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Measured tool calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent tool calls")
+    parser.add_argument("--distinct", type=int, default=20, help="Distinct requests in the warm cache scenario")
+    parser.add_argument("--burst-size", type=int, default=10, help="Identical calls per burst")
+    parser.add_argument("--error-rate", type=float, default=0.5, help="Upstream error rate in the error storm")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Mock median latency for fast endpoints")
+    parser.add_argument("--plan-latency-ms", type=float, default=500, help="Mock median latency for plan endpoints")
+    parser.add_argument("--mock-port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment variable for gym.py (repeatable)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
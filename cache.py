@@ -0,0 +1,258 @@
+from typing import Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+    """Bounded in-memory LRU cache with per-entry TTL and a byte budget
+
+    Entries can carry a stale window after their TTL, during which lookup()
+    still returns them flagged as stale so callers can revalidate in the
+    background.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, int, float, float]] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Optional[tuple[Any, bool]]:
+        """Return (value, is_stale) for key, or None if missing or past its stale window"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, size, fresh_until, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        stale = fresh_until <= now
+        if stale:
+            self.stale_hits += 1
+        return value, stale
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self.lookup(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0.0) -> None:
+        """Store value under key for ttl seconds plus an optional stale window,
+        evicting least recently used entries"""
+        if ttl + stale_ttl <= 0:
+            return
+
+        size = len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        now = time.monotonic()
+        self._entries[key] = (value, size, now + ttl, now + ttl + stale_ttl)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a single entry; returns True if it was present"""
+        if key in self._entries:
+            self._remove(key)
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class DiskCache:
+    """SQLite-backed response cache that survives server restarts
+
+    Values are stored zlib-compressed. When the total stored size exceeds
+    max_bytes the least recently accessed entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, compress_level: int = 6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "endpoint TEXT NOT NULL, "
+            "value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, "
+            "stale_at REAL)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if "stale_at" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN stale_at REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple[Any, float, float]]:
+        """Return (value, fresh_seconds_left, seconds_left) for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stale_at FROM responses WHERE key = ?",
+                (self._hash(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, stale_at = row
+            if expires_at <= now:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key = ?", (self._hash(key),))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, self._hash(key)))
+            self._conn.commit()
+
+        self.hits += 1
+        fresh_left = (stale_at if stale_at is not None else expires_at) - now
+        return json.loads(zlib.decompress(value)), fresh_left, expires_at - now
+
+    def set(self, key: str, endpoint: str, value: Any, ttl: float, stale_ttl: float = 0.0) -> None:
+        """Store value under key for ttl seconds plus an optional stale window"""
+        if ttl + stale_ttl <= 0:
+            return
+
+        blob = zlib.compress(
+            json.dumps(value, separators=(",", ":")).encode("utf-8"), self.compress_level)
+        if len(blob) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, endpoint, value, size, expires_at, accessed_at, stale_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._hash(key), endpoint, blob, len(blob), now + ttl + stale_ttl, now, now + ttl))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def values(self, endpoint: str) -> list[Any]:
+        """Return every unexpired value stored for an endpoint"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM responses WHERE endpoint = ? AND expires_at > ?",
+                (endpoint, time.time())).fetchall()
+        return [json.loads(zlib.decompress(value)) for (value,) in rows]
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a single entry; returns True if it was present"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE key = ?", (self._hash(key),))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,190 @@
+from typing import Iterable, Optional
+from collections import defaultdict
+import json
+import re
+
+
+def compact(name: str) -> str:
+    """Reduce a name to lower-case letters and digits, so "Push-ups" and "push ups" match"""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def display_name(name: str) -> str:
+    """Tidy a free-form exercise name for sending upstream"""
+    words = re.sub(r"\s+", " ", name).strip()
+    return words[:1].upper() + words[1:]
+
+
+def trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance counting an adjacent transposition as one edit"""
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class ExerciseCatalog:
+    """In-memory index of known exercise names and their aliases
+
+    Every name and alias is indexed by its compact form (plus a singular
+    form without a trailing "s") for exact matches, and by character
+    trigrams for fuzzy matches, so variants such as "pushups", "push ups"
+    and "psuh-ups" all resolve to the canonical "Push-ups". A fuzzy match
+    is only accepted when it looks like a typo: one edit away, or two on a
+    long name with a high trigram score. Names differing by a digit or by a
+    whole word ("exercise-2", "jump squat") are treated as different
+    exercises. Names learned from API responses are capped at max_learned.
+    """
+
+    def __init__(self, min_similarity: float = 0.7, max_learned: int = 5000):
+        self.min_similarity = min_similarity
+        self.max_learned = max_learned
+        self.learned = 0
+        self.names: set[str] = set()
+        self.attributes: dict[str, dict] = {}
+        self._aliases: dict[str, str] = {}
+        self._trigrams: dict[str, set[str]] = defaultdict(set)
+        self._key_trigrams: dict[str, set[str]] = {}
+        self.resolved = 0
+        self.fuzzy_resolved = 0
+        self.unresolved = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _keys(name: str) -> list[str]:
+        key = compact(name)
+        if len(key) > 3 and key.endswith("s"):
+            return [key, key[:-1]]
+        return [key] if key else []
+
+    def add(self, name: str, aliases: Iterable[str] = (), attributes: Optional[dict] = None) -> str:
+        """Add an exercise, or new aliases for a known one; returns its canonical name
+
+        `attributes` describes the exercise for the local plan engine
+        (category, muscles, equipment, level and conditions to avoid).
+        """
+        canonical = self.lookup(name) or display_name(name)
+        self.names.add(canonical)
+        if attributes:
+            self.attributes[canonical] = attributes
+        for alias in (canonical, name, *aliases):
+            for key in self._keys(alias):
+                # Earlier entries win, so the seed file's choices are kept
+                self._aliases.setdefault(key, canonical)
+                if key not in self._key_trigrams:
+                    self._key_trigrams[key] = trigrams(key)
+                    for gram in self._key_trigrams[key]:
+                        self._trigrams[gram].add(key)
+        return canonical
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the canonical name for an exact (case, spacing and plural-insensitive) match"""
+        for key in self._keys(name):
+            if key in self._aliases:
+                return self._aliases[key]
+        return None
+
+    def _candidates(self, key: str) -> list[tuple[str, float]]:
+        """Return indexed keys sharing a trigram with key, with their Dice similarity, best first"""
+        query_grams = trigrams(key)
+        shared: dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] += 1
+
+        scored = [(candidate, 2 * count / (len(query_grams) + len(self._key_trigrams[candidate])))
+                  for candidate, count in shared.items()]
+        return sorted(scored, key=lambda item: (-item[1], item[0]))
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        """Return up to `limit` (canonical name, similarity) pairs, best first"""
+        key = compact(query)
+        if not key:
+            return []
+
+        # Keep the best-scoring alias per exercise
+        best: dict[str, float] = {}
+        for candidate, score in self._candidates(key):
+            canonical = self._aliases[candidate]
+            if canonical not in best:
+                best[canonical] = score
+                if len(best) == limit:
+                    break
+        return [(name, round(score, 3)) for name, score in best.items()]
+
+    def resolve(self, name: str) -> str:
+        """Map a requested name to its canonical form, falling back to a tidied version of it"""
+        canonical = self.lookup(name)
+        if canonical is not None:
+            self.resolved += 1
+            return canonical
+
+        key = compact(name)
+        candidates = self._candidates(key)[:5] if len(key) >= 5 else []
+        for candidate, score in candidates:
+            if self._is_typo(key, candidate, score):
+                self.fuzzy_resolved += 1
+                return self._aliases[candidate]
+
+        self.unresolved += 1
+        return display_name(name)
+
+    def _is_typo(self, key: str, candidate: str, score: float) -> bool:
+        """Whether key looks like a misspelling of candidate rather than another exercise"""
+        if re.sub(r"\D", "", key) != re.sub(r"\D", "", candidate):
+            return False
+        # An added or missing word, such as "jump squat" for "squat"
+        if key in candidate or candidate in key:
+            return False
+        distance = edit_distance(key, candidate)
+        if distance == 1:
+            return True
+        return distance == 2 and len(key) >= 12 and score >= self.min_similarity
+
+    def learn(self, requested: str, response: dict) -> None:
+        """Record the name the API returned in an exercise details response, with the requested name as an alias"""
+        result = response.get("result") if isinstance(response, dict) else None
+        returned = result.get("exercise_name") if isinstance(result, dict) else None
+        if not isinstance(returned, str) or not returned.strip() or self.learned >= self.max_learned:
+            return
+        known = len(self._aliases)
+        self.add(returned, [requested] if requested.strip() else [])
+        self.learned += len(self._aliases) - known
+
+    def load_seed(self, path: str) -> int:
+        """Add the exercises listed in a JSON seed file; returns how many were read"""
+        with open(path) as f:
+            entries = json.load(f)
+        for entry in entries:
+            attributes = {key: value for key, value in entry.items() if key not in ("name", "aliases")}
+            self.add(entry["name"], entry.get("aliases", []), attributes)
+        return len(entries)
+
+    def described(self) -> list[tuple[str, dict]]:
+        """Return (name, attributes) for every exercise that has attributes, sorted by name"""
+        return sorted(self.attributes.items())
+
+    def stats(self) -> dict:
+        """Return catalog size and resolution counters"""
+        return {
+            "exercises": len(self.names),
+            "aliases": len(self._aliases),
+            "learned": self.learned,
+            "resolved": self.resolved,
+            "fuzzy_resolved": self.fuzzy_resolved,
+            "unresolved": self.unresolved
+        }
@@ -3,10 +3,15 @@ from langchain_groq import ChatGroq
 from mcp_use import MCPAgent, MCPClient
 import os
 from dotenv import load_dotenv
+from tracing import Tracer, instrument_mcp_client
 
 # Load environment variables
 load_dotenv()
 
+# Trace agent runs and the MCP tool calls they make when GYM_TRACE_FILE is set
+tracer = Tracer("gym-client", os.getenv("GYM_TRACE_FILE"))
+instrument_mcp_client(tracer)
+
 
 async def run_memory_chat():
     """Run a chat using MCPAgent's built-in conversation memory."""
@@ -62,7 +67,8 @@ async def run_memory_chat():
 
             try:
                 # Run the agent with the user input (memory handling is automatic)
-                response = await agent.run(user_input)
+                with tracer.span("agent.run", attributes={"gym.input_chars": len(user_input)}):
+                    response = await agent.run(user_input)
                 print(response)
 
             except Exception as e:
@@ -1,6 +1,29 @@
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import signal
+import socket
+import tempfile
+import time
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from cache import DiskCache, ResponseCache
+from catalog import ExerciseCatalog, compact
+from metrics import Metrics
+from nutrition import nutrition_profile, nutrition_targets
+from plan_engine import NoExercisesError, build_plan
+from resilience import (AdaptiveLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+                        LatencyTracker, RateLimitExceeded, RetryBudget, SharedTokenBucket, TokenBucket,
+                        UpstreamError, backoff_delay, parse_retry_after)
+from logs import dropped_records, setup_logging
+from text import snake_case
+from tracing import Tracer
 import os
 import logging
 from dotenv import load_dotenv
@@ -8,23 +31,739 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging: records are written to stderr by a background thread so a
+# slow stderr pipe cannot stall the event loop
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_PAYLOAD_SAMPLE_RATE, LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
 
-# Initialize FastMCP server
-mcp = FastMCP("gym")
-
 # Constants
-BASE_URL = "https://ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com"
+BASE_URL = os.getenv(
+    "BASE_URL", "https://ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com")
 RAPID_APIKEY = os.getenv("RAPID_APIKEY")
+REQUEST_TIMEOUT = 30
+
+# HTTP connection pool settings
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Request coalescing settings
+SINGLE_FLIGHT_ENABLED = os.getenv(
+    "SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Response cache settings
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTLS = {
+    "/generateWorkoutPlan": float(os.getenv("CACHE_TTL_WORKOUT_PLAN", "3600")),
+    "/customWorkoutPlan": float(os.getenv("CACHE_TTL_CUSTOM_WORKOUT_PLAN", "3600")),
+    "/nutritionAdvice": float(os.getenv("CACHE_TTL_NUTRITION_ADVICE", "21600")),
+    "/exerciseDetails": float(os.getenv("CACHE_TTL_EXERCISE_DETAILS", "604800"))
+}
+CACHE_MODES = ("default", "bypass", "refresh")
+
+# Stale-while-revalidate windows: how long past its TTL a cached plan may
+# still be served while it is refreshed in the background
+CACHE_STALE_TTLS = {
+    "/generateWorkoutPlan": float(os.getenv("CACHE_STALE_TTL_WORKOUT_PLAN", "86400")),
+    "/customWorkoutPlan": float(os.getenv("CACHE_STALE_TTL_CUSTOM_WORKOUT_PLAN", "86400"))
+}
+
+# Retry settings for transient upstream failures
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN = float(os.getenv("RETRY_BUDGET_MIN", "10"))
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+# Circuit breaker settings, applied per endpoint
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+
+# Client-side rate limits in requests per second (0 disables a limit).
+# The key limit is shared by every endpoint called with the same API key.
+RATE_LIMIT_KEY_RPS = float(os.getenv("RATE_LIMIT_KEY_RPS", "10"))
+RATE_LIMIT_KEY_BURST = float(os.getenv("RATE_LIMIT_KEY_BURST", "20"))
+RATE_LIMITS = {
+    "/generateWorkoutPlan": float(os.getenv("RATE_LIMIT_WORKOUT_PLAN_RPS", "0")),
+    "/customWorkoutPlan": float(os.getenv("RATE_LIMIT_CUSTOM_WORKOUT_PLAN_RPS", "0")),
+    "/nutritionAdvice": float(os.getenv("RATE_LIMIT_NUTRITION_ADVICE_RPS", "0")),
+    "/exerciseDetails": float(os.getenv("RATE_LIMIT_EXERCISE_DETAILS_RPS", "0"))
+}
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+
+# Adaptive concurrency settings, applied per endpoint
+ADAPTIVE_CONCURRENCY_ENABLED = os.getenv(
+    "ADAPTIVE_CONCURRENCY_ENABLED", "true").lower() in ("1", "true", "yes")
+ADAPTIVE_CONCURRENCY_INITIAL = float(os.getenv("ADAPTIVE_CONCURRENCY_INITIAL", "10"))
+ADAPTIVE_CONCURRENCY_MIN = float(os.getenv("ADAPTIVE_CONCURRENCY_MIN", "1"))
+ADAPTIVE_CONCURRENCY_MAX = float(os.getenv("ADAPTIVE_CONCURRENCY_MAX", "100"))
+ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE = float(
+    os.getenv("ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+ADAPTIVE_CONCURRENCY_BACKOFF_RATIO = float(
+    os.getenv("ADAPTIVE_CONCURRENCY_BACKOFF_RATIO", "0.9"))
+
+# Request hedging settings (opt-in). A second identical request is sent when
+# the first has not answered within HEDGE_PERCENTILE of recent latency.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_ENDPOINTS = tuple(
+    path.strip() for path in os.getenv("HEDGE_ENDPOINTS", "/exerciseDetails").split(",") if path.strip())
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+
+# Default deadline per tool call in seconds. An MCP client can override it
+# per request by sending "timeout_ms" in the request _meta.
+TOOL_TIMEOUTS = {
+    "generateWorkoutPlan": float(os.getenv("TOOL_TIMEOUT_WORKOUT_PLAN", "60")),
+    "customWorkoutPlan": float(os.getenv("TOOL_TIMEOUT_CUSTOM_WORKOUT_PLAN", "60")),
+    "nutritionAdvice": float(os.getenv("TOOL_TIMEOUT_NUTRITION_ADVICE", "45")),
+    "exerciseDetail": float(os.getenv("TOOL_TIMEOUT_EXERCISE_DETAIL", "20")),
+    "generateWorkoutPlansBatch": float(os.getenv("TOOL_TIMEOUT_WORKOUT_PLANS_BATCH", "300")),
+    "exerciseDetails": float(os.getenv("TOOL_TIMEOUT_EXERCISE_DETAILS", "60"))
+}
+# A timeout cut short by a deadline still counts as an upstream failure once
+# the call has waited at least this long and past the endpoint's recent p99
+DEADLINE_FAILURE_MIN_WAIT = float(os.getenv("DEADLINE_FAILURE_MIN_WAIT", "1"))
+# Extra time the tool call waits past its deadline, so the HTTP timeout fires
+# first and the failure is recorded rather than cancelled
+DEADLINE_GRACE = 0.05
+
+# Batch tool settings
+BATCH_MAX_PROFILES = int(os.getenv("BATCH_MAX_PROFILES", "100"))
+BATCH_MAX_EXERCISES = int(os.getenv("BATCH_MAX_EXERCISES", "100"))
+# Upstream requests one batch call keeps in flight; the rate and concurrency
+# limiters still apply on top of this
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "10"))
+
+# Whether nutritionAdvice also fetches written advice from the API when the
+# caller does not say; calorie and macro targets are always calculated locally
+NUTRITION_ADVICE = os.getenv("NUTRITION_ADVICE", "false").lower() in ("1", "true", "yes")
+NUTRITION_BATCH_MAX_PROFILES = int(os.getenv("NUTRITION_BATCH_MAX_PROFILES", "10000"))
+
+# Local exercise catalog, used to canonicalize exercise names before lookups
+# and by the local plan engine
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").lower() in ("1", "true", "yes")
+CATALOG_SEED_PATH = os.getenv(
+    "CATALOG_SEED_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercise_catalog.json"))
+CATALOG_MIN_SIMILARITY = float(os.getenv("CATALOG_MIN_SIMILARITY", "0.7"))
+# Names and aliases the catalog may learn from API responses
+CATALOG_MAX_LEARNED = int(os.getenv("CATALOG_MAX_LEARNED", "5000"))
+
+# Where workout plans come from by default: the API or the local plan engine
+PLAN_SOURCES = ("api", "local")
+PLAN_SOURCE = os.getenv("PLAN_SOURCE", "api")
+# Build plans locally instead of failing while the API's circuit is open
+PLAN_LOCAL_FALLBACK = os.getenv("PLAN_LOCAL_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Tracing: OTLP/JSON spans are appended to this file when it is set
+TRACE_FILE = os.getenv("GYM_TRACE_FILE")
+
+# Transport settings: stdio serves the one client that spawned the process,
+# streamable-http and sse serve many clients from one long-running process
+TRANSPORTS = ("stdio", "streamable-http", "sse")
+GYM_TRANSPORT = os.getenv("GYM_TRANSPORT", "stdio")
+GYM_HOST = os.getenv("GYM_HOST", "127.0.0.1")
+GYM_PORT = int(os.getenv("GYM_PORT", "8000"))
+# Concurrent HTTP connections and requests before new ones get a 503 (0 = unlimited)
+GYM_MAX_CONNECTIONS = int(os.getenv("GYM_MAX_CONNECTIONS", "1000"))
+# Worker processes sharing the listening socket (streamable-http only)
+GYM_WORKERS = int(os.getenv("GYM_WORKERS", "1"))
+
+# Persistent cache settings (disabled unless DISK_CACHE_PATH is set)
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH")
+DISK_CACHE_MAX_BYTES = int(
+    os.getenv("DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# SQLite file holding rate limiter state shared between processes (unset = per process)
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+
+# Workers share the response cache and rate limits through SQLite files, so
+# they must not default to per-process state
+if GYM_WORKERS > 1:
+    DISK_CACHE_PATH = DISK_CACHE_PATH or os.path.join(
+        tempfile.gettempdir(), f"gym-{GYM_PORT}-cache.sqlite3")
+    SHARED_STATE_PATH = SHARED_STATE_PATH or os.path.join(
+        tempfile.gettempdir(), f"gym-{GYM_PORT}-state.sqlite3")
 
 if not RAPID_APIKEY:
     logger.warning("RAPID_APIKEY environment variable not set")
 
+# Shared HTTP client, opened at server start and closed at shutdown
+http_client: Optional[httpx.AsyncClient] = None
+# Number of open lifespans using the client; over HTTP every MCP session
+# enters the lifespan, and the client is shared by all of them
+lifespan_users = 0
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the pooled HTTP client used for all upstream requests"""
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning(
+                "HTTP2_ENABLED is set but the 'h2' package is not installed; falling back to HTTP/1.1")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+    return httpx.AsyncClient(
+        headers={
+            'x-rapidapi-host': "ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com",
+            'Content-Type': "application/json"
+        },
+        limits=limits,
+        timeout=REQUEST_TIMEOUT,
+        http2=http2
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it if the server lifespan has not"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = create_http_client()
+    return http_client
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[dict]:
+    """Open the shared HTTP client at server start and close it when the last user exits"""
+    global http_client, lifespan_users
+    client = get_http_client()
+    if lifespan_users == 0:
+        logger.info(
+            "HTTP client pool opened (max_connections=%d, max_keepalive=%d, keepalive_expiry=%ss)",
+            HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY)
+    lifespan_users += 1
+    try:
+        yield {"http_client": client}
+    finally:
+        lifespan_users -= 1
+        if lifespan_users == 0:
+            await client.aclose()
+            http_client = None
+            logger.info("HTTP client pool closed")
+
+
+# Initialize FastMCP server
+mcp = FastMCP("gym", lifespan=server_lifespan, host=GYM_HOST, port=GYM_PORT)
+
+
+class SingleFlight:
+    """Share one in-flight upstream call between concurrent identical requests"""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+        """Run fn once per key; concurrent callers with the same key await the same result"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.followers += 1
+            logger.info("Coalescing request onto in-flight call: %s", key, extra={"cache_key": key})
+
+        # Shield so one cancelled caller does not cancel the call for the
+        # others, but cancel it once nobody is waiting for the result
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+
+
+metrics = Metrics()
+tracer = Tracer("gym", TRACE_FILE)
+single_flight = SingleFlight()
+retry_budgets: dict[str, RetryBudget] = {}
+circuit_breakers: dict[str, CircuitBreaker] = {}
+rate_limiters: dict[str, TokenBucket] = {}
+concurrency_limiters: dict[str, AdaptiveLimiter] = {}
+latency_trackers: dict[str, LatencyTracker] = {}
+hedge_budget = RetryBudget(HEDGE_BUDGET_RATIO, 0)
+response_cache = ResponseCache(CACHE_MAX_BYTES, CACHE_MAX_ENTRIES)
+disk_cache = DiskCache(
+    DISK_CACHE_PATH, DISK_CACHE_MAX_BYTES) if DISK_CACHE_PATH else None
+catalog = ExerciseCatalog(CATALOG_MIN_SIMILARITY, CATALOG_MAX_LEARNED)
+
+
+def load_catalog() -> None:
+    """Fill the exercise catalog from the seed file and previously cached responses"""
+    if CATALOG_SEED_PATH and os.path.exists(CATALOG_SEED_PATH):
+        try:
+            catalog.load_seed(CATALOG_SEED_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load exercise catalog seed %s: %s", CATALOG_SEED_PATH, e)
+    if disk_cache:
+        for response in disk_cache.values("/exerciseDetails"):
+            catalog.learn("", response)
+    logger.info("Exercise catalog loaded with %d exercises", len(catalog))
+
+
+def resolve_exercise_name(name: str) -> str:
+    """Canonicalize an exercise name through the catalog"""
+    return catalog.resolve(name) if CATALOG_ENABLED else name.strip()
+
+
+load_catalog()
+
+
+# Payload fields normalized before hashing and sending upstream. Enum-like
+# values are snake-cased; free text is only trimmed, so its meaning is kept.
+ENUM_FIELDS = ("goal", "fitness_level", "daily_activity_level")
+ENUM_LIST_FIELDS = ("preferences", "health_conditions", "dietary_restrictions")
+TEXT_LIST_FIELDS = ("custom_goals",)
+
+
+def normalize_list(items: list, normalize: Callable[[str], str]) -> list:
+    """Normalize string items, then drop blanks and duplicates and sort"""
+    return sorted({
+        normalize(item) if isinstance(item, str) else item
+        for item in items
+        if not (isinstance(item, str) and item.strip() == "")
+    })
+
+
+def normalize_payload(payload: dict) -> dict:
+    """Canonicalize enum and list fields so equivalent requests share a key"""
+    normalized = dict(payload)
+
+    for field in ENUM_FIELDS:
+        if isinstance(normalized.get(field), str):
+            normalized[field] = snake_case(normalized[field])
+
+    # Language tags are case-insensitive, but "pt-BR" must keep its hyphen
+    if isinstance(normalized.get("lang"), str):
+        normalized["lang"] = normalized["lang"].strip().lower()
+
+    for field in ENUM_LIST_FIELDS:
+        if isinstance(normalized.get(field), list):
+            normalized[field] = normalize_list(normalized[field], snake_case)
+
+    for field in TEXT_LIST_FIELDS:
+        if isinstance(normalized.get(field), list):
+            normalized[field] = normalize_list(normalized[field], str.strip)
+
+    return normalized
+
+
+def request_key(endpoint: str, payload: dict) -> str:
+    """Build a stable key for an upstream request from the endpoint and a payload hash"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return f"{endpoint}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+# Absolute deadline (time.monotonic) for the tool call being served
+request_deadline: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current tool call's deadline, or None if it has none"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def tool_timeout(tool: str, ctx: Optional[Context]) -> float:
+    """Return the deadline for a tool call, from the MCP request or the tool default"""
+    timeout = TOOL_TIMEOUTS.get(tool, REQUEST_TIMEOUT)
+    if ctx is None:
+        return timeout
+
+    try:
+        meta = ctx.request_context.meta
+    except ValueError:
+        return timeout
+
+    requested = getattr(meta, "timeout_ms", None) if meta else None
+    if isinstance(requested, (int, float)) and requested > 0:
+        return requested / 1000
+    return timeout
+
+
+async def with_deadline(tool: str, ctx: Optional[Context], request: Awaitable[dict]) -> dict:
+    """Await an upstream request under the tool call's deadline"""
+    timeout = tool_timeout(tool, ctx)
+    token = request_deadline.set(time.monotonic() + timeout)
+    try:
+        return await asyncio.wait_for(request, timeout + DEADLINE_GRACE)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(
+            f"Request did not complete within its {timeout:g}s deadline")
+    finally:
+        request_deadline.reset(token)
+
 
-async def make_api_request(endpoint: str, payload: dict) -> dict:
+def endpoint_path(endpoint: str) -> str:
+    """Strip the query string from an endpoint"""
+    return endpoint.split("?", 1)[0]
+
+
+# Background refreshes of stale cache entries, keyed by request key
+revalidation_tasks: dict[str, asyncio.Task] = {}
+
+
+def schedule_revalidation(key: str, load: Callable[[], Awaitable[dict]]) -> None:
+    """Refresh a stale cache entry in the background, once per key"""
+    if key in revalidation_tasks:
+        return
+
+    async def revalidate() -> None:
+        try:
+            if SINGLE_FLIGHT_ENABLED:
+                await single_flight.do(key, load)
+            else:
+                await load()
+            logger.info("Revalidated stale cache entry: %s", key, extra={"cache_key": key})
+        except Exception as e:
+            logger.warning("Background revalidation failed for %s: %s", key, e, extra={"cache_key": key})
+        finally:
+            revalidation_tasks.pop(key, None)
+
+    revalidation_tasks[key] = asyncio.create_task(revalidate())
+
+
+def with_cache_status(endpoint: str, result: Any, status: str) -> Any:
+    """Tag responses from stale-while-revalidate endpoints with their cache status"""
+    if CACHE_STALE_TTLS.get(endpoint_path(endpoint), 0) <= 0 or not isinstance(result, dict):
+        return result
+    return {**result, "cache_status": status}
+
+
+async def make_api_request(endpoint: str, payload: dict, cache_mode: str = "default") -> dict:
     """Make API request to the gym management service"""
+    attributes = {"gym.endpoint": endpoint_path(endpoint), "gym.cache_mode": cache_mode}
+    with tracer.span("make_api_request", attributes=attributes):
+        return await cached_request(endpoint, payload, cache_mode)
+
+
+async def cached_request(endpoint: str, payload: dict, cache_mode: str) -> dict:
+    """Serve a request from the cache or the upstream API"""
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(
+            f"cache_mode must be one of: {', '.join(CACHE_MODES)}")
+
+    payload = normalize_payload(payload)
+    key = request_key(endpoint, payload)
+    use_cache = CACHE_ENABLED and cache_mode != "bypass"
+
+    async def load() -> dict:
+        result = await fetch_upstream(endpoint, payload)
+        if use_cache:
+            ttl = CACHE_TTLS.get(endpoint_path(endpoint), 0)
+            stale_ttl = CACHE_STALE_TTLS.get(endpoint_path(endpoint), 0)
+            response_cache.set(key, result, ttl, stale_ttl)
+            if disk_cache:
+                await asyncio.to_thread(
+                    disk_cache.set, key, endpoint_path(endpoint), result, ttl, stale_ttl)
+        return result
+
+    if use_cache and cache_mode == "default":
+        entry = response_cache.lookup(key)
+
+        if entry is None and disk_cache:
+            stored = await asyncio.to_thread(disk_cache.get, key)
+            if stored is not None:
+                cached, fresh_left, ttl_left = stored
+                logger.info("Disk cache hit: %s", key, extra={"cache_key": key})
+                response_cache.set(key, cached, fresh_left, ttl_left - fresh_left)
+                entry = (cached, fresh_left <= 0)
+
+        if entry is not None:
+            cached, stale = entry
+            tracer.current_span().set_attribute("gym.cache", "stale" if stale else "fresh")
+            if not stale:
+                logger.info("Cache hit: %s", key, extra={"cache_key": key})
+                return with_cache_status(endpoint, cached, "fresh")
+
+            logger.info("Serving stale cache entry while revalidating: %s", key, extra={"cache_key": key})
+            schedule_revalidation(key, load)
+            return with_cache_status(endpoint, cached, "stale")
+    elif cache_mode == "refresh":
+        response_cache.invalidate(key)
+        if disk_cache:
+            await asyncio.to_thread(disk_cache.invalidate, key)
+
+    tracer.current_span().set_attribute("gym.cache", "miss" if cache_mode == "default" else cache_mode)
+    if SINGLE_FLIGHT_ENABLED:
+        result = await single_flight.do(key, load)
+    else:
+        result = await load()
+
+    return with_cache_status(endpoint, result, "revalidated")
+
+
+def get_retry_budget(endpoint: str) -> RetryBudget:
+    """Return the retry budget for an endpoint"""
+    path = endpoint_path(endpoint)
+    if path not in retry_budgets:
+        retry_budgets[path] = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN)
+    return retry_budgets[path]
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Return the circuit breaker for an endpoint"""
+    path = endpoint_path(endpoint)
+    if path not in circuit_breakers:
+        circuit_breakers[path] = CircuitBreaker(
+            CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, CIRCUIT_HALF_OPEN_MAX_CALLS)
+    return circuit_breakers[path]
+
+
+def get_rate_limiters(endpoint: str) -> list:
+    """Return the endpoint and API key rate limiters that apply to a request"""
+    limits = [
+        (f"endpoint:{endpoint_path(endpoint)}",
+         RATE_LIMITS.get(endpoint_path(endpoint), 0), None),
+        (f"key:{hashlib.sha256((RAPID_APIKEY or '').encode('utf-8')).hexdigest()[:12]}",
+         RATE_LIMIT_KEY_RPS, RATE_LIMIT_KEY_BURST)
+    ]
+
+    limiters = []
+    for name, rate, burst in limits:
+        if rate <= 0:
+            continue
+        if name not in rate_limiters:
+            if SHARED_STATE_PATH:
+                rate_limiters[name] = SharedTokenBucket(
+                    SHARED_STATE_PATH, name, rate, burst or max(1.0, rate))
+            else:
+                rate_limiters[name] = TokenBucket(rate, burst or max(1.0, rate))
+        limiters.append(rate_limiters[name])
+    return limiters
+
+
+async def acquire_rate_limit(endpoint: str, max_wait: float = RATE_LIMIT_MAX_WAIT) -> None:
+    """Wait for a token from every applicable rate limiter, or shed the request"""
+    acquired = []
+    try:
+        for limiter in get_rate_limiters(endpoint):
+            await limiter.acquire(max_wait)
+            acquired.append(limiter)
+    except BaseException:
+        for limiter in acquired:
+            limiter.release()
+        raise
+
+
+async def fetch_upstream(endpoint: str, payload: dict) -> dict:
+    """Send a request to the upstream API, retrying transient failures"""
+    budget = get_retry_budget(endpoint)
+    budget.record_request()
+    breaker = get_circuit_breaker(endpoint)
+
+    attempt = 0
+    while True:
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Request deadline passed before calling the API")
+        # Checked before the rate limit, so rejected calls fail fast and spend no tokens
+        if not breaker.allow_request():
+            raise CircuitOpenError(
+                f"API temporarily unavailable for {endpoint_path(endpoint)}; "
+                f"retry in {breaker.retry_in():.1f}s")
+
+        try:
+            await acquire_rate_limit(
+                endpoint, RATE_LIMIT_MAX_WAIT if remaining is None else min(RATE_LIMIT_MAX_WAIT, remaining))
+        except BaseException:
+            breaker.release()
+            raise
+
+        try:
+            result = await send_hedged(endpoint, payload)
+            breaker.record_success()
+            return result
+        except DeadlineExceeded:
+            # The caller ran out of time; that says nothing about upstream health
+            breaker.release()
+            raise
+        except UpstreamError as e:
+            # Client errors such as a 400 say nothing about upstream health
+            if e.unhealthy:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            attempt += 1
+            if not e.retryable or attempt >= RETRY_MAX_ATTEMPTS:
+                raise
+
+            if e.retry_after is not None:
+                if e.retry_after > RETRY_MAX_DELAY:
+                    raise
+                delay = e.retry_after
+            else:
+                delay = backoff_delay(attempt - 1, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+
+            remaining = time_remaining()
+            if remaining is not None and delay >= remaining:
+                raise
+
+            if not budget.try_acquire():
+                logger.warning("Retry budget exhausted for %s", endpoint_path(endpoint))
+                raise
+
+            logger.warning(
+                "Retrying %s in %.2fs (attempt %d/%d): %s",
+                endpoint_path(endpoint), delay, attempt + 1, RETRY_MAX_ATTEMPTS, e)
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.release()
+            raise
+
+
+def get_latency_tracker(endpoint: str) -> LatencyTracker:
+    """Return the recent latency window for an endpoint"""
+    path = endpoint_path(endpoint)
+    if path not in latency_trackers:
+        latency_trackers[path] = LatencyTracker()
+    return latency_trackers[path]
+
+
+def healthy_wait(endpoint: str) -> float:
+    """Seconds a healthy upstream may take to answer, from recent latency and DEADLINE_FAILURE_MIN_WAIT"""
+    p99 = get_latency_tracker(endpoint).percentile(99)
+    return max(DEADLINE_FAILURE_MIN_WAIT, p99 or 0.0)
+
+
+async def send_timed(endpoint: str, payload: dict) -> dict:
+    """Send a single request and record its latency for hedging decisions"""
+    started = time.monotonic()
+    result = await send_limited(endpoint, payload)
+    get_latency_tracker(endpoint).record(time.monotonic() - started)
+    return result
+
+
+async def send_hedged(endpoint: str, payload: dict) -> dict:
+    """Send a request, hedging with a second identical one if the first is slow"""
+    if not HEDGE_ENABLED or endpoint_path(endpoint) not in HEDGE_ENDPOINTS:
+        return await send_timed(endpoint, payload)
+
+    hedge_budget.record_request()
+    tracker = get_latency_tracker(endpoint)
+    hedge_after = tracker.percentile(HEDGE_PERCENTILE)
+    if len(tracker.samples) < HEDGE_MIN_SAMPLES or hedge_after is None:
+        return await send_timed(endpoint, payload)
+
+    # No point hedging if the caller gives up before the hedge could answer
+    remaining = time_remaining()
+    if remaining is not None and max(HEDGE_MIN_DELAY, hedge_after) >= remaining:
+        return await send_timed(endpoint, payload)
+
+    primary = asyncio.ensure_future(send_timed(endpoint, payload))
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=max(HEDGE_MIN_DELAY, hedge_after))
+        if done:
+            return primary.result()
+
+        # Hedges must not queue behind the rate limiter or exceed the budget
+        if not hedge_budget.try_acquire():
+            return await primary
+        try:
+            await acquire_rate_limit(endpoint, max_wait=0)
+        except RateLimitExceeded:
+            hedge_budget.refund()
+            return await primary
+
+        logger.info("Hedging %s after %.3fs without a response", endpoint_path(endpoint), hedge_after)
+        pending.add(asyncio.ensure_future(send_timed(endpoint, payload)))
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def get_concurrency_limiter(endpoint: str) -> Optional[AdaptiveLimiter]:
+    """Return the adaptive concurrency limiter for an endpoint, if enabled"""
+    if not ADAPTIVE_CONCURRENCY_ENABLED:
+        return None
+
+    path = endpoint_path(endpoint)
+    if path not in concurrency_limiters:
+        concurrency_limiters[path] = AdaptiveLimiter(
+            ADAPTIVE_CONCURRENCY_INITIAL,
+            ADAPTIVE_CONCURRENCY_MIN,
+            ADAPTIVE_CONCURRENCY_MAX,
+            ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE,
+            ADAPTIVE_CONCURRENCY_BACKOFF_RATIO)
+    return concurrency_limiters[path]
+
+
+async def send_limited(endpoint: str, payload: dict) -> dict:
+    """Send a single request once the endpoint's concurrency limit allows it"""
+    limiter = get_concurrency_limiter(endpoint)
+    if limiter is None:
+        return await send_request(endpoint, payload)
+
+    await limiter.acquire()
+    started = time.monotonic()
+    try:
+        result = await send_request(endpoint, payload)
+    except DeadlineExceeded:
+        limiter.release()
+        raise
+    except UpstreamError as e:
+        limiter.release(time.monotonic() - started, dropped=e.unhealthy)
+        raise
+    except BaseException:
+        limiter.release()
+        raise
+
+    limiter.release(time.monotonic() - started)
+    return result
+
+
+async def send_request(endpoint: str, payload: dict) -> dict:
+    """Send a single request to the upstream API"""
     if not RAPID_APIKEY:
         raise Exception(
             "API key not configured. Please set RAPID_APIKEY environment variable.")
@@ -32,23 +771,49 @@ async def make_api_request(endpoint: str, payload: dict) -> dict:
     url = f"{BASE_URL}{endpoint}"
 
     headers = {
-        'x-rapidapi-key': RAPID_APIKEY,
-        'x-rapidapi-host': "ai-workout-planner-exercise-fitness-nutrition-guide.p.rapidapi.com",
-        'Content-Type': "application/json"
+        'x-rapidapi-key': RAPID_APIKEY
     }
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=payload, timeout=30)
+    timeout = REQUEST_TIMEOUT
+    remaining = time_remaining()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceeded("Request deadline passed before calling the API")
+        timeout = min(timeout, remaining)
+
+    # The upstream endpoints only compute results from the payload, so
+    # timeouts and dropped connections are safe to retry
+    path = endpoint_path(endpoint)
+    attributes = {"http.request.method": "POST", "url.path": path}
+    with tracer.span("upstream.request", kind="client", attributes=attributes) as span:
+        started = time.perf_counter()
+        try:
+            client = get_http_client()
+            response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+            span.set_attribute("http.response.status_code", response.status_code)
+            metrics.record_upstream(
+                path, str(response.status_code), time.perf_counter() - started, len(response.content))
             response.raise_for_status()
             return response.json()
-    except httpx.TimeoutException:
-        raise Exception("API request timed out. Please try again.")
-    except httpx.HTTPStatusError as e:
-        raise Exception(
-            f"API request failed with status {e.response.status_code}: {e.response.text}")
-    except Exception as e:
-        raise Exception(f"API request failed: {str(e)}")
+        except httpx.TimeoutException:
+            metrics.record_upstream(path, "timeout", time.perf_counter() - started)
+            # A deadline too short for a normal response says nothing about upstream health
+            if timeout < REQUEST_TIMEOUT and timeout < healthy_wait(endpoint):
+                raise DeadlineExceeded("Request deadline passed while waiting for the API")
+            raise UpstreamError(
+                "API request timed out. Please try again.", retryable=True)
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            raise UpstreamError(
+                f"API request failed with status {status_code}: {e.response.text}",
+                status_code=status_code,
+                retry_after=parse_retry_after(e.response.headers.get("Retry-After")),
+                retryable=status_code in RETRYABLE_STATUS_CODES)
+        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            metrics.record_upstream(path, "connection_error", time.perf_counter() - started)
+            raise UpstreamError(f"API request failed: {str(e)}", retryable=True)
+        except Exception as e:
+            raise UpstreamError(f"API request failed: {str(e)}")
 
 
 def validate_required_params(**kwargs) -> dict:
@@ -68,7 +833,96 @@ def validate_required_params(**kwargs) -> dict:
     return validated_params
 
 
+def workout_plan_payload(
+    goal: Optional[str] = None,
+    fitness_level: Optional[str] = None,
+    preferences: Optional[list[str]] = None,
+    health_conditions: Optional[list[str]] = None,
+    days_per_week: Optional[int] = None,
+    session_duration: Optional[int] = None,
+    plan_duration_weeks: Optional[int] = None,
+    lang: str = "en"
+) -> dict:
+    """Build a /generateWorkoutPlan payload, applying defaults; raises ValueError on invalid input"""
+    # Batch profiles are untyped dicts, so check types before using the values
+    for name, value in (("days_per_week", days_per_week), ("session_duration", session_duration),
+                        ("plan_duration_weeks", plan_duration_weeks)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(f"{name} must be an integer")
+    for name, value in (("goal", goal), ("fitness_level", fitness_level), ("lang", lang)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+    for name, value in (("preferences", preferences), ("health_conditions", health_conditions)):
+        if value is not None and (
+                not isinstance(value, list) or not all(isinstance(item, str) for item in value)):
+            raise ValueError(f"{name} must be a list of strings")
+
+    # Set defaults for missing values
+    goal = goal or "general_fitness"
+    fitness_level = fitness_level or "beginner"
+    preferences = preferences or ["mixed"]
+    health_conditions = health_conditions or []
+    days_per_week = days_per_week or 3
+    session_duration = session_duration or 45
+    plan_duration_weeks = plan_duration_weeks or 4
+
+    # Validate numeric parameters
+    if not (1 <= days_per_week <= 7):
+        raise ValueError("days_per_week must be between 1 and 7")
+    if not (15 <= session_duration <= 180):
+        raise ValueError(
+            "session_duration must be between 15 and 180 minutes")
+    if not (1 <= plan_duration_weeks <= 52):
+        raise ValueError(
+            "plan_duration_weeks must be between 1 and 52 weeks")
+
+    return {
+        "goal": goal,
+        "fitness_level": fitness_level,
+        "preferences": preferences,
+        "health_conditions": health_conditions,
+        "schedule": {
+            "days_per_week": days_per_week,
+            "session_duration": session_duration
+        },
+        "plan_duration_weeks": plan_duration_weeks,
+        "lang": lang
+    }
+
+
+def validate_plan_source(plan_source: Optional[str]) -> str:
+    """Return the requested plan source, or the server default; raises ValueError if unknown"""
+    plan_source = plan_source or PLAN_SOURCE
+    if plan_source not in PLAN_SOURCES:
+        raise ValueError(f"plan_source must be one of: {', '.join(PLAN_SOURCES)}")
+    return plan_source
+
+
+async def request_workout_plan(payload: dict, cache_mode: str, plan_source: str) -> dict:
+    """Get a workout plan from the API, or from the local plan engine when asked or while the API is down"""
+    if plan_source == "local":
+        tracer.current_span().set_attribute("gym.plan_source", "local")
+        return build_plan(payload, catalog)
+
+    try:
+        return await make_api_request("/generateWorkoutPlan?noqueue=1", payload, cache_mode)
+    except CircuitOpenError as e:
+        if not PLAN_LOCAL_FALLBACK:
+            raise
+        try:
+            plan = build_plan(payload, catalog)
+        except NoExercisesError as local_error:
+            # An empty plan is no substitute; report the outage instead
+            logger.warning("No local workout plan to fall back on: %s", local_error)
+            raise e
+        logger.warning("Serving a local workout plan while the API is unavailable: %s", e)
+        tracer.current_span().set_attribute("gym.plan_source", "local_fallback")
+        return plan
+
+
 @mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
 async def generateWorkoutPlan(
     goal: Optional[str] = None,
     fitness_level: Optional[str] = None,
@@ -77,7 +931,10 @@ async def generateWorkoutPlan(
     days_per_week: Optional[int] = None,
     session_duration: Optional[int] = None,
     plan_duration_weeks: Optional[int] = None,
-    lang: str = "en"
+    lang: str = "en",
+    cache_mode: str = "default",
+    plan_source: Optional[str] = None,
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Generate a workout plan based on user input.
@@ -91,113 +948,319 @@ async def generateWorkoutPlan(
         session_duration: Duration of each session in minutes
         plan_duration_weeks: Duration of the plan in weeks
         lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entry and fetch again
+        plan_source: "api" for the workout planner service or "local" for an
+            instant rule-based plan built offline (default: server setting)
     """
     try:
-        # Set defaults for missing values
-        goal = goal or "general_fitness"
-        fitness_level = fitness_level or "beginner"
-        preferences = preferences or ["mixed"]
-        health_conditions = health_conditions or []
-        days_per_week = days_per_week or 3
-        session_duration = session_duration or 45
-        plan_duration_weeks = plan_duration_weeks or 4
-
-        # Validate numeric parameters
-        if not (1 <= days_per_week <= 7):
-            raise ValueError("days_per_week must be between 1 and 7")
-        if not (15 <= session_duration <= 180):
-            raise ValueError(
-                "session_duration must be between 15 and 180 minutes")
-        if not (1 <= plan_duration_weeks <= 52):
-            raise ValueError(
-                "plan_duration_weeks must be between 1 and 52 weeks")
+        plan_source = validate_plan_source(plan_source)
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of: {', '.join(CACHE_MODES)}")
+        payload = workout_plan_payload(
+            goal, fitness_level, preferences, health_conditions,
+            days_per_week, session_duration, plan_duration_weeks, lang)
 
-        payload = {
-            "goal": goal,
-            "fitness_level": fitness_level,
-            "preferences": preferences,
-            "health_conditions": health_conditions,
-            "schedule": {
-                "days_per_week": days_per_week,
-                "session_duration": session_duration
-            },
-            "plan_duration_weeks": plan_duration_weeks,
-            "lang": lang
-        }
-
-        logger.info(f"Generating workout plan with payload: {payload}")
-        return await make_api_request("/generateWorkoutPlan?noqueue=1", payload)
+        logger.info("Generating workout plan", extra={"payload": payload})
+        return await with_deadline(
+            "generateWorkoutPlan", ctx, request_workout_plan(payload, cache_mode, plan_source))
 
     except ValueError as e:
         return {"error": str(e), "status": "validation_error"}
     except Exception as e:
-        logger.error(f"Error generating workout plan: {str(e)}")
+        logger.error("Error generating workout plan: %s", e)
         return {"error": str(e), "status": "api_error"}
 
 
+# Member profile fields accepted by nutritionTargetsBatch
+NUTRITION_PROFILE_FIELDS = ("goal", "dietary_restrictions", "current_weight", "target_weight",
+                            "daily_activity_level", "height_cm", "age", "sex")
+
+# Member profile fields accepted by generateWorkoutPlansBatch
+WORKOUT_PROFILE_FIELDS = ("goal", "fitness_level", "preferences", "health_conditions",
+                          "days_per_week", "session_duration", "plan_duration_weeks")
+
+
+async def fetch_batch(tool: str, ctx: Optional[Context], payloads: dict[str, dict],
+                      request: Callable[[dict], Awaitable[dict]],
+                      on_result: Callable[[str, dict], Awaitable[None]]) -> None:
+    """Run distinct requests concurrently under one deadline, reporting each outcome as it arrives
+
+    `payloads` maps request keys to the payloads passed to `request`.
+    `on_result` receives each key with either {"status": "ok", "result": ...}
+    or an error entry; requests still unfinished at the deadline are
+    cancelled and reported as errors.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch(payload: dict) -> dict:
+        async with semaphore:
+            return await request(payload)
+
+    # The tasks inherit the deadline, so upstream calls stop waiting when it passes
+    timeout = tool_timeout(tool, ctx)
+    deadline = time.monotonic() + timeout
+    token = request_deadline.set(deadline)
+    try:
+        tasks = {asyncio.create_task(fetch(payload)): key for key, payload in payloads.items()}
+    finally:
+        request_deadline.reset(token)
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for task in done:
+                try:
+                    outcome = {"status": "ok", "result": task.result()}
+                except Exception as e:
+                    logger.error("Error in %s request %s: %s", tool, tasks[task], e)
+                    outcome = {"error": str(e), "status": "api_error"}
+                await on_result(tasks[task], outcome)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    for task in pending:
+        await on_result(tasks[task], {
+            "error": f"Request did not complete within the {timeout:g}s deadline",
+            "status": "api_error"
+        })
+
+
+async def stream_batch_result(ctx: Optional[Context], completed: int, total: int, entry: dict) -> None:
+    """Send a finished batch entry to the client as progress and log notifications"""
+    if ctx is None:
+        return
+
+    try:
+        await ctx.report_progress(completed, total, f"{completed}/{total} profiles done")
+        await ctx.session.send_log_message(
+            "info", entry, logger="generateWorkoutPlansBatch", related_request_id=ctx.request_id)
+    except Exception as e:
+        # The final result still carries every entry
+        logger.debug("Could not stream batch result: %s", e)
+
+
 @mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
+async def generateWorkoutPlansBatch(
+    profiles: Optional[list[dict]] = None,
+    lang: str = "en",
+    cache_mode: str = "default",
+    plan_source: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Generate workout plans for a whole cohort of members in one call.
+
+    Each profile takes the same fields as generateWorkoutPlan: goal,
+    fitness_level, preferences, health_conditions, days_per_week,
+    session_duration and plan_duration_weeks. Profiles describing the same
+    plan are requested once. Each plan is also streamed to the client as a
+    progress and log notification as soon as it is ready.
+
+    Args:
+        profiles: List of member profiles
+        lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entries and fetch again
+        plan_source: "api" for the workout planner service or "local" for
+            instant rule-based plans built offline (default: server setting)
+
+    Returns one entry per profile, in input order, holding either `result`
+    or `error` and `status`.
+    """
+    try:
+        if not profiles:
+            raise ValueError("profiles must be a non-empty list of member profiles")
+        if len(profiles) > BATCH_MAX_PROFILES:
+            raise ValueError(f"At most {BATCH_MAX_PROFILES} profiles can be sent in one batch")
+        plan_source = validate_plan_source(plan_source)
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of: {', '.join(CACHE_MODES)}")
+    except ValueError as e:
+        return {"error": str(e), "status": "validation_error"}
+
+    endpoint = "/generateWorkoutPlan?noqueue=1"
+    results: list[Optional[dict]] = [None] * len(profiles)
+
+    # Group profiles by request key so each distinct plan is fetched once
+    requests: dict[str, tuple[dict, list[int]]] = {}
+    for index, profile in enumerate(profiles):
+        try:
+            if not isinstance(profile, dict):
+                raise ValueError("Each profile must be an object")
+            unknown = set(profile) - set(WORKOUT_PROFILE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+            payload = workout_plan_payload(**profile, lang=lang)
+        except ValueError as e:
+            results[index] = {"index": index, "error": str(e), "status": "validation_error"}
+            continue
+        key = request_key(endpoint, normalize_payload(payload))
+        requests.setdefault(key, (payload, []))[1].append(index)
+
+    logger.info("Generating %d workout plans (%d distinct)", len(profiles), len(requests))
+    completed = sum(1 for entry in results if entry is not None)
+
+    async def on_result(key: str, outcome: dict) -> None:
+        nonlocal completed
+        indexes = requests[key][1]
+        for index in indexes:
+            results[index] = {"index": index, **outcome}
+            if index != indexes[0]:
+                results[index]["duplicate_of"] = indexes[0]
+        completed += len(indexes)
+        await stream_batch_result(ctx, completed, len(profiles), {"indexes": indexes, **outcome})
+
+    await fetch_batch(
+        "generateWorkoutPlansBatch", ctx, {key: payload for key, (payload, _) in requests.items()},
+        lambda payload: request_workout_plan(payload, cache_mode, plan_source), on_result)
+
+    failed = sum(1 for entry in results if entry["status"] != "ok")
+    return {
+        "total": len(profiles),
+        "distinct_requests": len(requests),
+        "succeeded": len(profiles) - failed,
+        "failed": failed,
+        "results": results
+    }
+
+
+@mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
 async def nutritionAdvice(
     goal: Optional[str] = None,
     dietary_restrictions: Optional[list[str]] = None,
     current_weight: Optional[float] = None,
     target_weight: Optional[float] = None,
     daily_activity_level: Optional[str] = None,
-    lang: str = "en"
+    height_cm: Optional[float] = None,
+    age: Optional[int] = None,
+    sex: Optional[str] = None,
+    include_advice: Optional[bool] = None,
+    lang: str = "en",
+    cache_mode: str = "default",
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Generate nutrition advice based on user input.
 
+    Calorie, macro, fiber and water targets are calculated locally. Written
+    advice from the nutrition service is added only when include_advice is set.
+
     Args:
         goal: Nutrition goal (e.g., "weight_loss", "weight_gain", "maintain_weight")
         dietary_restrictions: List of dietary restrictions (e.g., ["vegetarian", "gluten_free"])
         current_weight: Current weight in kg
         target_weight: Target weight in kg
         daily_activity_level: Activity level (e.g., "sedentary", "moderate", "active", "very_active")
+        height_cm: Height in cm, for a more precise calorie estimate
+        age: Age in years, for a more precise calorie estimate
+        sex: "male" or "female", for a more precise calorie estimate
+        include_advice: Also fetch written advice from the nutrition service
+            (default: server setting)
         lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entry and fetch again
     """
     try:
-        # Set defaults for missing values
-        goal = goal or "maintain_weight"
-        dietary_restrictions = dietary_restrictions or []
-        current_weight = current_weight or 70.0
-        target_weight = target_weight or current_weight
-        daily_activity_level = daily_activity_level or "moderate"
-
-        # Validate weight parameters
-        if not (30 <= current_weight <= 300):
-            raise ValueError("current_weight must be between 30 and 300 kg")
-        if not (30 <= target_weight <= 300):
-            raise ValueError("target_weight must be between 30 and 300 kg")
-
-        # Validate activity level
-        valid_activity_levels = ["sedentary", "light",
-                                 "moderate", "active", "very_active"]
-        if daily_activity_level not in valid_activity_levels:
-            daily_activity_level = "moderate"
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of: {', '.join(CACHE_MODES)}")
+        profile = nutrition_profile(
+            goal, dietary_restrictions, current_weight, target_weight,
+            daily_activity_level, height_cm, age, sex)
+        targets = nutrition_targets(profile)
+        if include_advice is None:
+            include_advice = NUTRITION_ADVICE
+        if not include_advice:
+            return {"result": targets, "source": "local"}
 
         payload = {
-            "goal": goal,
-            "dietary_restrictions": dietary_restrictions,
-            "current_weight": current_weight,
-            "target_weight": target_weight,
-            "daily_activity_level": daily_activity_level,
+            "goal": profile["goal"],
+            "dietary_restrictions": profile["dietary_restrictions"],
+            "current_weight": profile["current_weight"],
+            "target_weight": profile["target_weight"],
+            "daily_activity_level": profile["daily_activity_level"],
             "lang": lang
         }
+    except ValueError as e:
+        return {"error": str(e), "status": "validation_error"}
 
-        logger.info(f"Getting nutrition advice with payload: {payload}")
-        return await make_api_request("/nutritionAdvice?noqueue=1", payload)
-
+    logger.info("Getting nutrition advice", extra={"payload": payload})
+    try:
+        response = await with_deadline(
+            "nutritionAdvice", ctx,
+            make_api_request("/nutritionAdvice?noqueue=1", payload, cache_mode))
+        return {**response, "targets": targets}
     except ValueError as e:
         return {"error": str(e), "status": "validation_error"}
     except Exception as e:
-        logger.error(f"Error getting nutrition advice: {str(e)}")
-        return {"error": str(e), "status": "api_error"}
+        # The targets do not depend on the API, so they are still worth returning
+        logger.warning("Returning nutrition targets without advice: %s", e)
+        return {"result": targets, "source": "local", "advice_error": str(e)}
+
+
+@mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
+async def nutritionTargetsBatch(profiles: Optional[list[dict]] = None) -> dict:
+    """
+    Calculate daily calorie and macro targets for many members at once.
+
+    Targets are calculated locally, so no call is made to the nutrition service.
+
+    Args:
+        profiles: Member profiles, each with the nutritionAdvice fields goal,
+            dietary_restrictions, current_weight, target_weight,
+            daily_activity_level, height_cm, age and sex (all optional)
+
+    Returns one entry per profile, in input order, holding either `result`
+    or `error` and `status`.
+    """
+    if not profiles:
+        return {"error": "profiles must be a non-empty list of member profiles", "status": "validation_error"}
+    if len(profiles) > NUTRITION_BATCH_MAX_PROFILES:
+        return {"error": f"At most {NUTRITION_BATCH_MAX_PROFILES} profiles can be sent in one batch",
+                "status": "validation_error"}
+
+    results = []
+    for index, profile in enumerate(profiles):
+        try:
+            if not isinstance(profile, dict):
+                raise ValueError("Each profile must be an object")
+            unknown = set(profile) - set(NUTRITION_PROFILE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+            results.append({"index": index, "status": "ok", "result": nutrition_targets(nutrition_profile(**profile))})
+        except ValueError as e:
+            results.append({"index": index, "error": str(e), "status": "validation_error"})
+
+    failed = sum(1 for entry in results if entry["status"] != "ok")
+    return {
+        "total": len(profiles),
+        "succeeded": len(profiles) - failed,
+        "failed": failed,
+        "results": results
+    }
 
 
 @mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
 async def exerciseDetail(
     exercise_name: Optional[str] = None,
-    lang: str = "en"
+    lang: str = "en",
+    cache_mode: str = "default",
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Get details about a specific exercise.
@@ -205,6 +1268,8 @@ async def exerciseDetail(
     Args:
         exercise_name: Name of the exercise to get details for
         lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entry and fetch again
     """
     try:
         if not exercise_name or exercise_name.strip() == "":
@@ -214,20 +1279,136 @@ async def exerciseDetail(
                 "suggestion": "Please provide an exercise name (e.g., 'push-ups', 'squats', 'bench press')"
             }
 
+        name = resolve_exercise_name(exercise_name)
         payload = {
-            "exercise_name": exercise_name.strip(),
+            "exercise_name": name,
             "lang": lang
         }
 
-        logger.info(f"Getting exercise details with payload: {payload}")
-        return await make_api_request("/exerciseDetails?noqueue=1", payload)
+        logger.info("Getting exercise details", extra={"payload": payload})
+        result = await with_deadline(
+            "exerciseDetail", ctx,
+            make_api_request("/exerciseDetails?noqueue=1", payload, cache_mode))
+        catalog.learn(exercise_name, result)
+        if compact(name) != compact(exercise_name):
+            return {**result, "resolved_name": name}
+        return result
 
+    except ValueError as e:
+        return {"error": str(e), "status": "validation_error"}
     except Exception as e:
-        logger.error(f"Error getting exercise details: {str(e)}")
+        logger.error("Error getting exercise details: %s", e)
         return {"error": str(e), "status": "api_error"}
 
 
 @mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
+async def exerciseDetails(
+    exercise_names: Optional[list[str]] = None,
+    lang: str = "en",
+    cache_mode: str = "default",
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Get details about several exercises in one call.
+
+    Use this instead of calling exerciseDetail once per exercise, e.g. to
+    explain every exercise in a workout plan. Repeated names are looked up
+    once, cached exercises are answered without calling the API and the
+    rest are fetched in parallel. Misspelled or variant names are matched
+    to known exercises first.
+
+    Args:
+        exercise_names: Names of the exercises to get details for
+        lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entries and fetch again
+
+    Returns a map from each requested name to its details, or to an entry
+    with `error` and `status` if that lookup failed.
+    """
+    try:
+        names = [name.strip() for name in exercise_names or [] if isinstance(name, str) and name.strip()]
+        if not names:
+            raise ValueError("exercise_names must list at least one exercise name")
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of: {', '.join(CACHE_MODES)}")
+    except ValueError as e:
+        return {
+            "error": str(e),
+            "status": "validation_error",
+            "suggestion": "Please provide exercise names (e.g., ['push-ups', 'squats', 'bench press'])"
+        }
+
+    # Names resolving to the same catalog entry are the same lookup
+    lookups: dict[str, tuple[dict, list[str]]] = {}
+    for name in names:
+        resolved = resolve_exercise_name(name)
+        requested = lookups.setdefault(compact(resolved), ({"exercise_name": resolved, "lang": lang}, []))[1]
+        if name not in requested:
+            requested.append(name)
+
+    if len(lookups) > BATCH_MAX_EXERCISES:
+        return {
+            "error": f"At most {BATCH_MAX_EXERCISES} distinct exercises can be looked up in one call",
+            "status": "validation_error"
+        }
+
+    logger.info("Getting details for %d exercises (%d distinct)", len(names), len(lookups))
+    exercises: dict[str, dict] = {}
+    failed = 0
+
+    async def on_result(key: str, outcome: dict) -> None:
+        nonlocal failed
+        if outcome["status"] != "ok":
+            failed += 1
+        for name in lookups[key][1]:
+            if outcome["status"] == "ok":
+                catalog.learn(name, outcome["result"])
+                exercises[name] = outcome["result"]
+            else:
+                exercises[name] = outcome
+
+    await fetch_batch(
+        "exerciseDetails", ctx, {key: payload for key, (payload, _) in lookups.items()},
+        lambda payload: make_api_request("/exerciseDetails?noqueue=1", payload, cache_mode), on_result)
+
+    return {
+        "exercises": {name: exercises[name] for name in dict.fromkeys(names)},
+        "requested": len(names),
+        "distinct": len(lookups),
+        "failed": failed
+    }
+
+
+@mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
+async def searchExercises(query: Optional[str] = None, limit: int = 10) -> dict:
+    """
+    Find known exercises whose names resemble a query, without calling the API.
+
+    Tolerates typos and naming variants (e.g., "pushups", "bench pres").
+
+    Args:
+        query: Exercise name or part of one
+        limit: Maximum number of matches to return (1-50)
+    """
+    if not query or not query.strip():
+        return {"error": "query is required", "status": "validation_error"}
+    if not (1 <= limit <= 50):
+        return {"error": "limit must be between 1 and 50", "status": "validation_error"}
+
+    return {
+        "query": query,
+        "matches": [{"name": name, "score": score} for name, score in catalog.search(query, limit)]
+    }
+
+
+@mcp.tool()
+@metrics.instrument_tool
+@tracer.trace_tool
 async def customWorkoutPlan(
     goal: Optional[str] = None,
     fitness_level: Optional[str] = None,
@@ -237,7 +1418,9 @@ async def customWorkoutPlan(
     session_duration: Optional[int] = None,
     plan_duration_weeks: Optional[int] = None,
     custom_goals: Optional[list[str]] = None,
-    lang: str = "en"
+    lang: str = "en",
+    cache_mode: str = "default",
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Generate a custom workout plan with additional goals.
@@ -252,57 +1435,181 @@ async def customWorkoutPlan(
         plan_duration_weeks: Duration of the plan in weeks
         custom_goals: Additional custom goals
         lang: Language code (default: "en")
+        cache_mode: "default" to use the response cache, "bypass" to skip it,
+            or "refresh" to invalidate the cached entry and fetch again
     """
     try:
-        # Set defaults for missing values
-        goal = goal or "general_fitness"
-        fitness_level = fitness_level or "beginner"
-        preferences = preferences or ["mixed"]
-        health_conditions = health_conditions or []
-        days_per_week = days_per_week or 3
-        session_duration = session_duration or 45
-        plan_duration_weeks = plan_duration_weeks or 4
-        custom_goals = custom_goals or []
-
-        # Validate numeric parameters
-        if not (1 <= days_per_week <= 7):
-            raise ValueError("days_per_week must be between 1 and 7")
-        if not (15 <= session_duration <= 180):
-            raise ValueError(
-                "session_duration must be between 15 and 180 minutes")
-        if not (1 <= plan_duration_weeks <= 52):
-            raise ValueError(
-                "plan_duration_weeks must be between 1 and 52 weeks")
+        payload = workout_plan_payload(
+            goal, fitness_level, preferences, health_conditions,
+            days_per_week, session_duration, plan_duration_weeks, lang)
+        payload["custom_goals"] = custom_goals or []
 
-        payload = {
-            "goal": goal,
-            "fitness_level": fitness_level,
-            "preferences": preferences,
-            "health_conditions": health_conditions,
-            "schedule": {
-                "days_per_week": days_per_week,
-                "session_duration": session_duration
-            },
-            "plan_duration_weeks": plan_duration_weeks,
-            "custom_goals": custom_goals,
-            "lang": lang
-        }
-
-        logger.info(f"Generating custom workout plan with payload: {payload}")
-        return await make_api_request("/customWorkoutPlan?noqueue=1", payload)
+        logger.info("Generating custom workout plan", extra={"payload": payload})
+        return await with_deadline(
+            "customWorkoutPlan", ctx,
+            make_api_request("/customWorkoutPlan?noqueue=1", payload, cache_mode))
 
     except ValueError as e:
         return {"error": str(e), "status": "validation_error"}
     except Exception as e:
-        logger.error(f"Error generating custom workout plan: {str(e)}")
+        logger.error("Error generating custom workout plan: %s", e)
         return {"error": str(e), "status": "api_error"}
 
 
+@mcp.resource("cache://stats")
+def cache_stats_resource() -> str:
+    """Response cache hit/miss/eviction counters"""
+    return json.dumps({
+        "memory": response_cache.stats(),
+        "disk": disk_cache.stats() if disk_cache else None,
+        "catalog": catalog.stats()
+    })
+
+
+@mcp.resource("upstream://status")
+def upstream_status_resource() -> str:
+    """Circuit breaker, retry budget, rate/concurrency limiter and hedging state"""
+    return json.dumps({
+        "circuit_breakers": {name: breaker.stats() for name, breaker in circuit_breakers.items()},
+        "retry_budgets": {name: budget.stats() for name, budget in retry_budgets.items()},
+        "rate_limiters": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+        "concurrency_limiters": {name: limiter.stats() for name, limiter in concurrency_limiters.items()},
+        "hedge_budget": hedge_budget.stats()
+    })
+
+
+def cache_metrics() -> dict:
+    """Cache and coalescing counters included in the metrics resources"""
+    return {
+        "memory": response_cache.stats(),
+        "disk": disk_cache.stats() if disk_cache else None,
+        "single_flight": {"leaders": single_flight.leaders, "followers": single_flight.followers}
+    }
+
+
+@mcp.resource("metrics://gym")
+def metrics_resource() -> str:
+    """Per-tool and per-endpoint latency histograms, error counts, cache hits and upstream bytes"""
+    return json.dumps(metrics.snapshot({
+        "cache": cache_metrics(),
+        "log_records_dropped": dropped_records(),
+        "trace_spans_dropped": tracer.dropped
+    }))
+
+
+@mcp.resource("metrics://gym/prometheus", mime_type="text/plain")
+def prometheus_metrics_resource() -> str:
+    """The gym metrics in Prometheus text format"""
+    cache = cache_metrics()
+    return metrics.prometheus({
+        "gym_cache_hits_total": ("counter", cache["memory"]["hits"]),
+        "gym_cache_stale_hits_total": ("counter", cache["memory"]["stale_hits"]),
+        "gym_cache_misses_total": ("counter", cache["memory"]["misses"]),
+        "gym_cache_evictions_total": ("counter", cache["memory"]["evictions"]),
+        "gym_cache_bytes": ("gauge", cache["memory"]["bytes"]),
+        "gym_disk_cache_hits_total": ("counter", cache["disk"]["hits"] if cache["disk"] else 0),
+        "gym_coalesced_requests_total": ("counter", single_flight.followers),
+        "gym_log_records_dropped_total": ("counter", dropped_records()),
+        "gym_trace_spans_dropped_total": ("counter", tracer.dropped)
+    })
+
+
 @mcp.resource("echo://{message}")
 def echo_resource(message: str) -> str:
     """Echo a message as a resource"""
     return f"Resource echo: {message}"
 
 
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint, served in the HTTP transport modes"""
+    return PlainTextResponse(prometheus_metrics_resource(), media_type="text/plain; version=0.0.4")
+
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def health_endpoint(request: Request) -> Response:
+    """Liveness check, served in the HTTP transport modes"""
+    return JSONResponse({"status": "ok"})
+
+
+async def serve_http(transport: str, sockets: Optional[list[socket.socket]] = None) -> None:
+    """Serve MCP over HTTP to any number of clients"""
+    import uvicorn
+
+    app = mcp.streamable_http_app() if transport == "streamable-http" else mcp.sse_app()
+    config = uvicorn.Config(
+        app,
+        host=GYM_HOST,
+        port=GYM_PORT,
+        limit_concurrency=GYM_MAX_CONNECTIONS or None,
+        # Leave uvicorn's records to the queued root handler
+        log_config=None,
+        access_log=False
+    )
+    logger.info("Serving %s transport on http://%s:%d", transport, GYM_HOST, GYM_PORT)
+    # Hold the shared HTTP client open across client sessions
+    async with server_lifespan(mcp):
+        await uvicorn.Server(config).serve(sockets=sockets)
+
+
+def run_worker(sock: socket.socket, transport: str) -> None:
+    """Entry point of a worker process serving on the supervisor's socket"""
+    # Consecutive requests of one client may reach different workers, so
+    # no MCP session state can be kept between them
+    mcp.settings.stateless_http = True
+    asyncio.run(serve_http(transport, sockets=[sock]))
+
+
+def serve_workers(transport: str, workers: int) -> None:
+    """Run worker processes on one shared listening socket, restarting any that exit"""
+    family = socket.AF_INET6 if ":" in GYM_HOST else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((GYM_HOST, GYM_PORT))
+    sock.listen(2048)
+
+    # Spawn rather than fork: the parent already runs the log writer thread
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    def start() -> multiprocessing.Process:
+        process = context.Process(target=run_worker, args=(sock, transport))
+        process.start()
+        return process
+
+    processes = [start() for _ in range(workers)]
+    logger.info("Serving %s transport on http://%s:%d with %d workers (cache %s, shared state %s)",
+                transport, GYM_HOST, GYM_PORT, workers, DISK_CACHE_PATH, SHARED_STATE_PATH)
+    try:
+        while not stopping:
+            for index, process in enumerate(processes):
+                if not process.is_alive() and not stopping:
+                    logger.warning("Worker %d exited with code %s; restarting", process.pid, process.exitcode)
+                    processes[index] = start()
+            time.sleep(0.5)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=10)
+        sock.close()
+
+
 if __name__ == "__main__":
-    mcp.run()
+    if GYM_TRANSPORT not in TRANSPORTS:
+        raise SystemExit(f"GYM_TRANSPORT must be one of: {', '.join(TRANSPORTS)}")
+    if GYM_WORKERS > 1 and GYM_TRANSPORT != "streamable-http":
+        raise SystemExit("GYM_WORKERS > 1 requires GYM_TRANSPORT=streamable-http")
+    if GYM_TRANSPORT == "stdio":
+        mcp.run()
+    elif GYM_WORKERS > 1:
+        serve_workers(GYM_TRANSPORT, GYM_WORKERS)
+    else:
+        asyncio.run(serve_http(GYM_TRANSPORT))
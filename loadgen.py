@@ -0,0 +1,165 @@
+"""Load generator simulating many gym members using the MCP server at once.
+
+Runs N simulated member sessions that call the gym tools with realistic
+arguments, either closed-loop (each member waits for its answer, then thinks
+before the next call) or open-loop (calls arrive at a fixed average rate no
+matter how fast the server answers), and prints a latency histogram:
+
+    python loadgen.py --members 200 --duration 60 --think-time 2
+    python loadgen.py --mode open --rate 50 --duration 60
+
+With --server-url, members connect to a gym.py already serving the
+streamable-http transport instead of spawning their own over stdio.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from contextlib import AsyncExitStack
+
+from bench import Recorder, gym_session, http_session, mock_upstream, pick_tool, realistic_arguments
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+def histogram(latencies: list[float]) -> list[dict]:
+    """Count latencies into LATENCY_BUCKETS_MS, with a final overflow bucket"""
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for latency in latencies:
+        ms = latency * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    bounds = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return [{"bucket": bound, "count": count} for bound, count in zip(bounds, counts)]
+
+
+def render_histogram(buckets: list[dict], width: int = 50) -> str:
+    peak = max((bucket["count"] for bucket in buckets), default=0) or 1
+    lines = []
+    for bucket in buckets:
+        bar = "#" * round(bucket["count"] / peak * width)
+        lines.append(f"{bucket['bucket']:>10} | {bar} {bucket['count']}")
+    return "\n".join(lines)
+
+
+async def closed_loop_member(session, rng: random.Random, recorder: Recorder,
+                             stop_at: float, think_time: float) -> None:
+    """One member: call a tool, wait for the answer, think, repeat"""
+    # Stagger start times so members do not all fire at once
+    await asyncio.sleep(rng.uniform(0, think_time))
+    while time.monotonic() < stop_at:
+        tool = pick_tool(rng)
+        await recorder.call(session, tool, realistic_arguments(tool, rng))
+        if think_time > 0:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def open_loop(sessions: list, rng: random.Random, recorder: Recorder,
+                    stop_at: float, rate: float) -> None:
+    """Issue calls as a Poisson process at `rate` per second, independent of response times"""
+    in_flight = set()
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(rng.expovariate(rate))
+        tool = pick_tool(rng)
+        task = asyncio.create_task(
+            recorder.call(rng.choice(sessions), tool, realistic_arguments(tool, rng)))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+async def run(args: argparse.Namespace, base_url: str) -> dict:
+    server_env = dict(item.split("=", 1) for item in args.server_env)
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+
+    # Each real client.py spawns its own gym.py; "shared" multiplexes every
+    # member over one server process instead. Against --server-url, every
+    # member gets its own session on the one HTTP server.
+    server_count = args.members if args.server_mode == "per-member" or args.server_url else 1
+
+    async with AsyncExitStack() as stack:
+        sessions = []
+        for _ in range(server_count):
+            session = http_session(args.server_url) if args.server_url else gym_session(base_url, server_env)
+            sessions.append(await stack.enter_async_context(session))
+        print(f"Opened {len(sessions)} server session(s); running {args.mode}-loop load "
+              f"for {args.duration}s...", file=sys.stderr)
+
+        started = time.monotonic()
+        stop_at = started + args.duration
+        if args.mode == "closed":
+            await asyncio.gather(*(
+                closed_loop_member(sessions[index % len(sessions)], random.Random(rng.random()),
+                                   recorder, stop_at, args.think_time)
+                for index in range(args.members)))
+        else:
+            await open_loop(sessions, rng, recorder, stop_at, args.rate)
+        elapsed = time.monotonic() - started
+
+    return {
+        "mode": args.mode,
+        "members": args.members,
+        "server_mode": "http" if args.server_url else args.server_mode,
+        **recorder.summary(elapsed),
+        "histogram": histogram(recorder.latencies)
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    if args.base_url:
+        return await run(args, args.base_url)
+
+    async with mock_upstream(args.mock_port, args.latency_ms, args.plan_latency_ms, args.seed) as mock:
+        await mock.post("/config", json={"error_rate": args.error_rate})
+        report = await run(args, str(mock.base_url))
+        report["upstream"] = (await mock.get("/stats")).json()
+        return report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate many concurrent gym members against the MCP server")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--members", type=int, default=100, help="Simulated member sessions")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load for")
+    parser.add_argument("--think-time", type=float, default=2.0,
+                        help="Mean seconds a member waits between calls (closed loop)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean calls per second (open loop)")
+    parser.add_argument("--server-mode", choices=["shared", "per-member"], default="shared",
+                        help="One gym.py for all members, or one per member like client.py")
+    parser.add_argument("--server-url",
+                        help="Streamable HTTP endpoint of a running gym.py, e.g. http://127.0.0.1:8000/mcp")
+    parser.add_argument("--base-url", help="Upstream for gym.py; defaults to a local mock_upstream.py")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Mock median latency for fast endpoints")
+    parser.add_argument("--plan-latency-ms", type=float, default=500, help="Mock median latency for plan endpoints")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock upstream error rate")
+    parser.add_argument("--mock-port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment variable for gym.py (repeatable)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+
+    latency = report["latency_ms"]
+    print(f"\n{report['requests']} calls in {report['elapsed_s']}s "
+          f"({report['requests_per_s']} calls/s), errors: {report['errors'] or 'none'}")
+    print(f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms max={latency['max']}ms\n")
+    print(render_histogram(report["histogram"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,126 @@
+"""Non-blocking structured logging.
+
+Log calls only put the record on a bounded in-memory queue; a background
+thread formats it and writes it to stderr. A slow or full stderr pipe
+therefore never blocks the event loop, and records are dropped rather than
+queued without bound when the writer falls behind. Records logged with a
+`payload` extra are sampled, since one is emitted for every tool call.
+"""
+
+from typing import Optional
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain `LEVEL:logger:message` lines, with the payload appended when present"""
+
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if hasattr(record, "payload"):
+            line += f" payload={json.dumps(record.payload, default=str)}"
+        return line
+
+
+class PayloadSampler(logging.Filter):
+    """Let through only a fraction of records that carry a `payload` extra"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "payload"):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full
+
+    Formatting is left to the listener thread; only the message arguments
+    are merged here, so later changes to them do not alter the record.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback objects keep whole frames alive; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", payload_sample_rate: float = 1.0,
+                  queue_size: int = 10000) -> Optional[logging.handlers.QueueListener]:
+    """Route the root logger through a background writer thread
+
+    Returns the started listener, or None if logging was already set up.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, DroppingQueueHandler) for handler in root.handlers):
+        return None
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(PayloadSampler(payload_sample_rate))
+
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def dropped_records() -> int:
+    """Number of log records dropped because the queue was full"""
+    return sum(handler.dropped for handler in logging.getLogger().handlers
+               if isinstance(handler, DroppingQueueHandler))
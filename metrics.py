@@ -0,0 +1,165 @@
+from typing import Any, Awaitable, Callable, Optional
+from bisect import bisect_left
+from collections import defaultdict
+import functools
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ERROR_STATUSES = ("validation_error", "api_error")
+
+
+class Histogram:
+    """Fixed-bucket latency histogram
+
+    Updates are plain integer increments on the event loop thread, so no
+    locking is needed.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        }
+
+
+class Metrics:
+    """Per-tool and per-endpoint counters and latency histograms"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.tool_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.tool_results: dict[tuple[str, str], int] = defaultdict(int)
+        self.upstream_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.upstream_responses: dict[tuple[str, str], int] = defaultdict(int)
+        self.upstream_bytes: dict[str, int] = defaultdict(int)
+
+    def record_tool(self, tool: str, status: str, latency: float) -> None:
+        self.tool_latency[tool].observe(latency)
+        self.tool_results[(tool, status)] += 1
+
+    def record_upstream(self, endpoint: str, outcome: str, latency: float, size: int = 0) -> None:
+        self.upstream_latency[endpoint].observe(latency)
+        self.upstream_responses[(endpoint, outcome)] += 1
+        self.upstream_bytes[endpoint] += size
+
+    def snapshot(self, extra: Optional[dict] = None) -> dict:
+        """Return all metrics as a JSON-serializable dict"""
+        tools = {}
+        for tool, histogram in self.tool_latency.items():
+            tools[tool] = {
+                "latency": histogram.snapshot(),
+                "results": {status: count for (name, status), count in self.tool_results.items()
+                            if name == tool}
+            }
+
+        endpoints = {}
+        for endpoint, histogram in self.upstream_latency.items():
+            endpoints[endpoint] = {
+                "latency": histogram.snapshot(),
+                "responses": {outcome: count for (name, outcome), count in self.upstream_responses.items()
+                              if name == endpoint},
+                "bytes": self.upstream_bytes[endpoint]
+            }
+
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "process_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            "tools": tools,
+            "upstream": endpoints,
+            **(extra or {})
+        }
+
+    def prometheus(self, extra: Optional[dict[str, tuple[str, float]]] = None) -> str:
+        """Render metrics in the Prometheus text exposition format
+
+        `extra` maps additional metric names to a (type, value) pair, for
+        state owned by other components such as the caches.
+        """
+        lines = []
+
+        def histogram_lines(name: str, label: str, value: str, histogram: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{label}="{value}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{{label}="{value}"}} {histogram.count}')
+
+        lines.append("# TYPE gym_tool_latency_seconds histogram")
+        for tool, histogram in self.tool_latency.items():
+            histogram_lines("gym_tool_latency_seconds", "tool", tool, histogram)
+
+        lines.append("# TYPE gym_tool_calls_total counter")
+        for (tool, status), count in self.tool_results.items():
+            lines.append(f'gym_tool_calls_total{{tool="{tool}",status="{status}"}} {count}')
+
+        lines.append("# TYPE gym_upstream_latency_seconds histogram")
+        for endpoint, histogram in self.upstream_latency.items():
+            histogram_lines("gym_upstream_latency_seconds", "endpoint", endpoint, histogram)
+
+        lines.append("# TYPE gym_upstream_responses_total counter")
+        for (endpoint, outcome), count in self.upstream_responses.items():
+            lines.append(f'gym_upstream_responses_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+
+        lines.append("# TYPE gym_upstream_bytes_total counter")
+        for endpoint, size in self.upstream_bytes.items():
+            lines.append(f'gym_upstream_bytes_total{{endpoint="{endpoint}"}} {size}')
+
+        for name, (kind, value) in (extra or {}).items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def instrument_tool(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Decorator recording latency and result status of an MCP tool"""
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            status = "exception"
+            try:
+                result = await fn(*args, **kwargs)
+                status = "ok"
+                if isinstance(result, dict) and result.get("status") in ERROR_STATUSES:
+                    status = result["status"]
+                return result
+            finally:
+                self.record_tool(fn.__name__, status, time.perf_counter() - started)
+
+        return wrapper
@@ -0,0 +1,228 @@
+"""Local stand-in for the RapidAPI workout planner service.
+
+Serves /generateWorkoutPlan, /nutritionAdvice, /exerciseDetails and
+/customWorkoutPlan with responses shaped like the real API, plus configurable
+latency, error rate and payload size, so gym.py can be load-tested offline:
+
+    python mock_upstream.py --port 8080 --plan-latency-ms 2000 --error-rate 0.05
+    BASE_URL=http://127.0.0.1:8080 RAPID_APIKEY=test python gym.py
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+from collections import Counter
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+EXERCISES = {
+    "cardio": ["Jumping Jacks", "Burpees", "Mountain Climbers", "High Knees", "Rowing", "Cycling"],
+    "strength_training": ["Squats", "Push-ups", "Deadlifts", "Lunges", "Bench Press", "Pull-ups"],
+    "flexibility": ["Hamstring Stretch", "Cat-Cow", "Hip Flexor Stretch", "Child's Pose"],
+    "mixed": ["Squats", "Push-ups", "Plank", "Lunges", "Burpees", "Glute Bridges", "Rowing"]
+}
+
+
+class MockConfig:
+    """Latency, error and payload settings for the mock service"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency_dist = args.latency_dist
+        self.latency_ms = args.latency_ms
+        self.plan_latency_ms = args.plan_latency_ms
+        self.latency_sigma = args.latency_sigma
+        self.error_rate = args.error_rate
+        self.error_statuses = [int(code) for code in args.error_statuses.split(",")]
+        self.retry_after = args.retry_after
+        self.padding_bytes = args.padding_bytes
+        self.random = random.Random(args.seed)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def latency(self, endpoint: str) -> float:
+        """Draw a response latency in seconds for an endpoint"""
+        median = self.plan_latency_ms if "WorkoutPlan" in endpoint else self.latency_ms
+        if self.latency_dist == "constant":
+            value = median
+        elif self.latency_dist == "uniform":
+            value = self.random.uniform(0, 2 * median)
+        else:
+            # Lognormal with the given median gives a realistic long tail
+            value = self.random.lognormvariate(math.log(max(median, 1e-3)), self.latency_sigma)
+        return value / 1000
+
+
+def padding(config: MockConfig) -> dict:
+    """Filler field used to grow responses to a configurable size"""
+    return {"notes": "x" * config.padding_bytes} if config.padding_bytes else {}
+
+
+def workout_plan(payload: dict, config: MockConfig) -> dict:
+    schedule = payload.get("schedule") or {}
+    days_per_week = int(schedule.get("days_per_week", 3))
+    session_duration = int(schedule.get("session_duration", 45))
+    preferences = payload.get("preferences") or ["mixed"]
+
+    pool = []
+    for preference in preferences:
+        pool.extend(EXERCISES.get(preference, EXERCISES["mixed"]))
+    rng = random.Random(json.dumps(payload, sort_keys=True))
+
+    days = []
+    for day in DAYS[:days_per_week]:
+        days.append({
+            "day": day,
+            "exercises": [{
+                "name": name,
+                "duration": f"{session_duration // 5} minutes",
+                "repetitions": f"{rng.choice([8, 10, 12, 15])} reps",
+                "sets": str(rng.choice([2, 3, 4])),
+                "equipment": rng.choice(["None", "Dumbbells", "Barbell", "Mat"])
+            } for name in rng.sample(pool, min(4, len(pool)))]
+        })
+
+    return {
+        "result": {
+            "goal": payload.get("goal"),
+            "fitness_level": payload.get("fitness_level"),
+            "total_weeks": payload.get("plan_duration_weeks", 4),
+            "schedule": {"days_per_week": days_per_week, "session_duration": session_duration},
+            "exercises": days,
+            "custom_goals": payload.get("custom_goals", []),
+            "seo_title": f"{payload.get('goal', 'fitness').replace('_', ' ').title()} Workout Plan",
+            "seo_content": "A structured plan generated by the local mock service.",
+            **padding(config)
+        }
+    }
+
+
+def nutrition_advice(payload: dict, config: MockConfig) -> dict:
+    weight = float(payload.get("current_weight", 70))
+    calories = round(weight * 30)
+    return {
+        "result": {
+            "goal": payload.get("goal"),
+            "calories_per_day": calories,
+            "macronutrients": {
+                "carbohydrates": f"{round(calories * 0.5 / 4)}g",
+                "proteins": f"{round(weight * 1.6)}g",
+                "fats": f"{round(calories * 0.25 / 9)}g"
+            },
+            "meal_suggestions": [
+                {"meal": "Breakfast", "suggestions": [{"name": "Oatmeal with berries", "calories": 350}]},
+                {"meal": "Lunch", "suggestions": [{"name": "Grilled chicken salad", "calories": 500}]},
+                {"meal": "Dinner", "suggestions": [{"name": "Salmon with vegetables", "calories": 600}]}
+            ],
+            "dietary_restrictions": payload.get("dietary_restrictions", []),
+            "description": "Nutrition guidance generated by the local mock service.",
+            **padding(config)
+        }
+    }
+
+
+def exercise_details(payload: dict, config: MockConfig) -> dict:
+    name = payload.get("exercise_name", "")
+    return {
+        "result": {
+            "exercise_name": name,
+            "description": f"{name} is a compound movement generated by the local mock service.",
+            "primary_muscles": ["Quadriceps", "Glutes"],
+            "secondary_muscles": ["Core", "Hamstrings"],
+            "equipment_needed": ["None"],
+            "steps": ["Set up in a stable position.", "Perform the movement with control.",
+                      "Return to the starting position."],
+            "benefits": ["Builds strength", "Improves mobility"],
+            "safety_tips": ["Keep your back neutral", "Warm up before starting"],
+            "variations": [f"Weighted {name}", f"Single-leg {name}"],
+            **padding(config)
+        }
+    }
+
+
+HANDLERS = {
+    "/generateWorkoutPlan": workout_plan,
+    "/customWorkoutPlan": workout_plan,
+    "/nutritionAdvice": nutrition_advice,
+    "/exerciseDetails": exercise_details
+}
+
+
+# Settings that can be changed while the service is running via POST /config
+RUNTIME_SETTINGS = ("latency_dist", "latency_ms", "plan_latency_ms", "latency_sigma",
+                    "error_rate", "error_statuses", "retry_after", "padding_bytes")
+
+
+def create_app(config: MockConfig) -> Starlette:
+    """Build the mock service application"""
+
+    async def handle(request: Request) -> JSONResponse:
+        endpoint = request.url.path
+        config.calls[endpoint] += 1
+        payload = await request.json()
+        await asyncio.sleep(config.latency(endpoint))
+
+        if config.random.random() < config.error_rate:
+            status = config.random.choice(config.error_statuses)
+            config.errors[endpoint] += 1
+            headers = {"Retry-After": str(config.retry_after)} if status == 429 else None
+            return JSONResponse({"message": "Simulated upstream error"}, status_code=status, headers=headers)
+
+        return JSONResponse(HANDLERS[endpoint](payload, config))
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse({"calls": dict(config.calls), "errors": dict(config.errors)})
+
+    async def reset(request: Request) -> JSONResponse:
+        config.calls.clear()
+        config.errors.clear()
+        return JSONResponse({"status": "ok"})
+
+    async def update_config(request: Request) -> JSONResponse:
+        # Lets benchmarks change latency and error behaviour between runs
+        updates = await request.json()
+        for name in RUNTIME_SETTINGS:
+            if name in updates:
+                setattr(config, name, updates[name])
+        return JSONResponse({name: getattr(config, name) for name in RUNTIME_SETTINGS})
+
+    routes = [Route(path, handle, methods=["POST"]) for path in HANDLERS]
+    routes.append(Route("/stats", stats, methods=["GET"]))
+    routes.append(Route("/reset", reset, methods=["POST"]))
+    routes.append(Route("/config", update_config, methods=["POST"]))
+    return Starlette(routes=routes)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local stand-in for the RapidAPI workout planner service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-dist", choices=["constant", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=300,
+                        help="Median latency for /nutritionAdvice and /exerciseDetails")
+    parser.add_argument("--plan-latency-ms", type=float, default=2000,
+                        help="Median latency for the workout plan endpoints")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="Spread of the lognormal latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an error")
+    parser.add_argument("--error-statuses", default="500,503,429",
+                        help="Comma-separated status codes to pick errors from")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After seconds sent with simulated 429s")
+    parser.add_argument("--padding-bytes", type=int, default=0,
+                        help="Extra bytes added to every successful response")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(MockConfig(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,178 @@
+"""Local calorie and macronutrient targets.
+
+Resting energy (BMR) uses the Mifflin-St Jeor equation when height, age and
+sex are known, and a per-kg estimate otherwise. Total daily energy
+expenditure (TDEE) is BMR times an activity factor, and the calorie target
+shifts TDEE toward the member's goal. Protein is set per kg of body weight,
+fat as a share of calories, and carbohydrates fill the rest. Everything is
+computed in-process, so targets never wait on the API.
+"""
+
+from typing import Optional
+import math
+
+from text import snake_case
+
+ACTIVITY_FACTORS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
+# Daily calories relative to TDEE, and the expected weekly weight change in kg
+GOAL_ADJUSTMENTS = {
+    "weight_loss": (-500, -0.5),
+    "weight_gain": (300, 0.25),
+    "maintain_weight": (0, 0.0)
+}
+
+GOAL_ALIASES = {
+    "lose_weight": "weight_loss",
+    "fat_loss": "weight_loss",
+    "gain_weight": "weight_gain",
+    "muscle_gain": "weight_gain",
+    "bulk": "weight_gain",
+    "maintain": "maintain_weight",
+    "maintenance": "maintain_weight"
+}
+
+PROTEIN_PER_KG = {"weight_loss": 2.0, "weight_gain": 1.8, "maintain_weight": 1.6}
+FAT_SHARE = 0.25
+# Daily carbohydrate caps for restrictions that limit them; fat makes up the difference
+CARB_LIMITS = {"keto": 30, "ketogenic": 30, "low_carb": 100}
+
+KCAL_PER_GRAM = {"protein": 4, "carbs": 4, "fat": 9}
+MIN_CALORIES = 1200
+# BMR per kg of body weight when height, age or sex is missing
+BMR_PER_KG = 22.0
+FIBER_PER_1000_KCAL = 14
+WATER_ML_PER_KG = 35
+
+SEXES = ("male", "female")
+
+
+def nutrition_profile(
+    goal: Optional[str] = None,
+    dietary_restrictions: Optional[list[str]] = None,
+    current_weight: Optional[float] = None,
+    target_weight: Optional[float] = None,
+    daily_activity_level: Optional[str] = None,
+    height_cm: Optional[float] = None,
+    age: Optional[int] = None,
+    sex: Optional[str] = None
+) -> dict:
+    """Fill in defaults and validate a member's nutrition inputs; raises ValueError if invalid"""
+    for name, value in (("current_weight", current_weight), ("target_weight", target_weight),
+                        ("height_cm", height_cm), ("age", age)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{name} must be a number")
+    for name, value in (("goal", goal), ("daily_activity_level", daily_activity_level), ("sex", sex)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+    if dietary_restrictions is not None and (
+            not isinstance(dietary_restrictions, list)
+            or not all(isinstance(item, str) for item in dietary_restrictions)):
+        raise ValueError("dietary_restrictions must be a list of strings")
+
+    current_weight = current_weight or 70.0
+    target_weight = target_weight or current_weight
+    if not (30 <= current_weight <= 300):
+        raise ValueError("current_weight must be between 30 and 300 kg")
+    if not (30 <= target_weight <= 300):
+        raise ValueError("target_weight must be between 30 and 300 kg")
+    if height_cm is not None and not (100 <= height_cm <= 250):
+        raise ValueError("height_cm must be between 100 and 250")
+    if age is not None and not (14 <= age <= 100):
+        raise ValueError("age must be between 14 and 100")
+    if sex is not None:
+        sex = snake_case(sex)
+        if sex not in SEXES:
+            raise ValueError(f"sex must be one of: {', '.join(SEXES)}")
+
+    daily_activity_level = snake_case(daily_activity_level or "moderate")
+    if daily_activity_level not in ACTIVITY_FACTORS:
+        daily_activity_level = "moderate"
+
+    return {
+        "goal": goal or "maintain_weight",
+        "dietary_restrictions": dietary_restrictions or [],
+        "current_weight": current_weight,
+        "target_weight": target_weight,
+        "daily_activity_level": daily_activity_level,
+        "height_cm": height_cm,
+        "age": age,
+        "sex": sex
+    }
+
+
+def resolve_goal(goal: str, current_weight: float, target_weight: float) -> str:
+    """Map a goal to a GOAL_ADJUSTMENTS key, inferring unknown goals from the target weight"""
+    goal = snake_case(goal)
+    goal = GOAL_ALIASES.get(goal, goal)
+    if goal in GOAL_ADJUSTMENTS:
+        return goal
+    if target_weight < current_weight - 0.5:
+        return "weight_loss"
+    if target_weight > current_weight + 0.5:
+        return "weight_gain"
+    return "maintain_weight"
+
+
+def bmr(weight: float, height_cm: Optional[float], age: Optional[int], sex: Optional[str]) -> tuple[float, str]:
+    """Return resting energy in kcal/day and the method used"""
+    if height_cm is None or age is None or sex is None:
+        return BMR_PER_KG * weight, "weight_estimate"
+    return 10 * weight + 6.25 * height_cm - 5 * age + (5 if sex == "male" else -161), "mifflin_st_jeor"
+
+
+def nutrition_targets(profile: dict) -> dict:
+    """Compute daily calorie, macro, fiber and water targets for a profile from nutrition_profile"""
+    weight = profile["current_weight"]
+    target_weight = profile["target_weight"]
+    goal = resolve_goal(profile["goal"], weight, target_weight)
+    adjustment, weekly_change = GOAL_ADJUSTMENTS[goal]
+
+    resting, method = bmr(weight, profile.get("height_cm"), profile.get("age"), profile.get("sex"))
+    tdee = resting * ACTIVITY_FACTORS[profile["daily_activity_level"]]
+    calories = max(MIN_CALORIES, tdee + adjustment)
+
+    protein = PROTEIN_PER_KG[goal] * weight
+    fat = FAT_SHARE * calories / KCAL_PER_GRAM["fat"]
+    carbs = max(0.0, (calories - protein * KCAL_PER_GRAM["protein"] - fat * KCAL_PER_GRAM["fat"])
+                / KCAL_PER_GRAM["carbs"])
+    restrictions = {snake_case(r) for r in profile["dietary_restrictions"]}
+    carb_limit = min((CARB_LIMITS[r] for r in restrictions if r in CARB_LIMITS), default=None)
+    if carb_limit is not None and carbs > carb_limit:
+        fat += (carbs - carb_limit) * KCAL_PER_GRAM["carbs"] / KCAL_PER_GRAM["fat"]
+        carbs = carb_limit
+
+    macros = {"protein_g": round(protein), "carbs_g": round(carbs), "fat_g": round(fat)}
+    energy = {"protein": protein * KCAL_PER_GRAM["protein"], "carbs": carbs * KCAL_PER_GRAM["carbs"],
+              "fat": fat * KCAL_PER_GRAM["fat"]}
+    total = sum(energy.values())
+
+    notes = []
+    if calories == MIN_CALORIES and tdee + adjustment < MIN_CALORIES:
+        notes.append(f"Calories were raised to the {MIN_CALORIES} kcal minimum; "
+                     "a slower rate of change is advised.")
+    weeks_to_target = None
+    gap = target_weight - weight
+    if weekly_change and gap and math.copysign(1, gap) == math.copysign(1, weekly_change):
+        weeks_to_target = math.ceil(gap / weekly_change)
+
+    return {
+        "goal": goal,
+        "bmr": round(resting),
+        "bmr_method": method,
+        "tdee": round(tdee),
+        "calories": round(calories),
+        "macros": macros,
+        "macro_split": {name: round(100 * value / total) for name, value in energy.items()},
+        "fiber_g": round(FIBER_PER_1000_KCAL * calories / 1000),
+        "water_ml": int(round(WATER_ML_PER_KG * weight, -1)),
+        "weekly_weight_change_kg": weekly_change,
+        "weeks_to_target": weeks_to_target,
+        "notes": notes
+    }
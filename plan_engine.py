@@ -0,0 +1,206 @@
+"""Rule-based workout plans built locally from the exercise catalog.
+
+Plans are assembled from per-goal templates (category mix, sets, reps and
+rest), scaled by fitness level and session length, spread over the week
+according to days_per_week and filtered by health_conditions. The output has
+the same shape as a /generateWorkoutPlan response, plus "source": "local".
+Building a plan takes well under a millisecond and never calls the API.
+"""
+
+import hashlib
+import json
+import random
+
+from catalog import ExerciseCatalog
+from text import snake_case
+
+LEVELS = ("beginner", "intermediate", "advanced")
+
+# Share of each session spent per exercise category, and the set scheme
+GOAL_TEMPLATES = {
+    "weight_loss": {"mix": {"cardio": 0.5, "strength": 0.3, "core": 0.2},
+                    "sets": 3, "reps": "12-15 reps", "rest": 45},
+    "muscle_gain": {"mix": {"strength": 0.8, "core": 0.2},
+                    "sets": 4, "reps": "8-12 reps", "rest": 90},
+    "strength": {"mix": {"strength": 0.85, "core": 0.15},
+                 "sets": 5, "reps": "4-6 reps", "rest": 150},
+    "endurance": {"mix": {"cardio": 0.6, "strength": 0.2, "core": 0.2},
+                  "sets": 3, "reps": "15-20 reps", "rest": 30},
+    "flexibility": {"mix": {"flexibility": 0.7, "core": 0.3},
+                    "sets": 2, "reps": "30-45 second hold", "rest": 15},
+    "general_fitness": {"mix": {"strength": 0.4, "cardio": 0.3, "core": 0.15, "flexibility": 0.15},
+                        "sets": 3, "reps": "10-12 reps", "rest": 60}
+}
+
+# Extra sets relative to the goal template
+LEVEL_SETS = {"beginner": -1, "intermediate": 0, "advanced": 1}
+
+PREFERENCE_CATEGORIES = {
+    "cardio": "cardio",
+    "hiit": "cardio",
+    "strength_training": "strength",
+    "strength": "strength",
+    "weightlifting": "strength",
+    "flexibility": "flexibility",
+    "yoga": "flexibility",
+    "stretching": "flexibility",
+    "core": "core"
+}
+
+# Health conditions named differently from the catalog's "avoid" lists
+CONDITION_ALIASES = {
+    "knee_pain": "knee_injury",
+    "bad_knees": "knee_injury",
+    "lower_back_pain": "back_pain",
+    "back_injury": "back_pain",
+    "shoulder_pain": "shoulder_injury",
+    "wrist_pain": "wrist_injury",
+    "hypertension": "high_blood_pressure"
+}
+
+TRAINING_DAYS = {
+    1: ["Monday"],
+    2: ["Monday", "Thursday"],
+    3: ["Monday", "Wednesday", "Friday"],
+    4: ["Monday", "Tuesday", "Thursday", "Friday"],
+    5: ["Monday", "Tuesday", "Wednesday", "Friday", "Saturday"],
+    6: ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"],
+    7: ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+}
+
+# Muscle groups strength work targets on each training day
+UPPER = {"chest", "back", "shoulders", "arms", "full_body"}
+LOWER = {"legs", "glutes", "full_body"}
+FULL = UPPER | LOWER
+DAY_FOCUS = {
+    1: [FULL],
+    2: [FULL, FULL],
+    3: [FULL, FULL, FULL],
+    4: [UPPER, LOWER, UPPER, LOWER],
+    5: [UPPER, LOWER, FULL, UPPER, LOWER],
+    6: [UPPER, LOWER, UPPER, LOWER, UPPER, LOWER],
+    7: [UPPER, LOWER, FULL, UPPER, LOWER, FULL, FULL]
+}
+
+# Minutes set aside per session for warm-up and cool-down
+WARM_UP_MINUTES = 5
+COOL_DOWN_MINUTES = 5
+MINUTES_PER_EXERCISE = 7
+
+
+class NoExercisesError(Exception):
+    """Raised when the catalog has no exercises a plan could be built from"""
+
+
+def repetitions(category: str, template: dict) -> str:
+    if category == "flexibility":
+        return "30-45 second hold"
+    if category == "cardio":
+        return "40 seconds"
+    return template["reps"]
+
+
+def category_mix(goal: str, preferences: list[str]) -> dict[str, float]:
+    """Return the goal's category shares, doubled for preferred categories and renormalized"""
+    mix = dict(GOAL_TEMPLATES.get(goal, GOAL_TEMPLATES["general_fitness"])["mix"])
+    for preference in preferences:
+        category = PREFERENCE_CATEGORIES.get(snake_case(preference))
+        if category:
+            mix[category] = mix.get(category, 0.1) * 2
+    total = sum(mix.values())
+    return {category: share / total for category, share in mix.items()}
+
+
+def split_count(mix: dict[str, float], count: int) -> dict[str, int]:
+    """Divide `count` exercises between categories in proportion to their share"""
+    exact = {category: share * count for category, share in mix.items()}
+    counts = {category: int(value) for category, value in exact.items()}
+    # Hand out the remainder to the largest fractional parts
+    for category in sorted(exact, key=lambda c: exact[c] - counts[c], reverse=True)[:count - sum(counts.values())]:
+        counts[category] += 1
+    return counts
+
+
+def build_plan(payload: dict, catalog: ExerciseCatalog) -> dict:
+    """Build a workout plan for a /generateWorkoutPlan payload from the catalog"""
+    goal = snake_case(payload.get("goal") or "general_fitness")
+    level = snake_case(payload.get("fitness_level") or "beginner")
+    level = level if level in LEVELS else "beginner"
+    preferences = payload.get("preferences") or ["mixed"]
+    schedule = payload.get("schedule") or {}
+    days_per_week = min(7, max(1, int(schedule.get("days_per_week", 3))))
+    session_duration = int(schedule.get("session_duration", 45))
+    conditions = {CONDITION_ALIASES.get(snake_case(c), snake_case(c))
+                  for c in payload.get("health_conditions") or []}
+
+    template = GOAL_TEMPLATES.get(goal, GOAL_TEMPLATES["general_fitness"])
+    sets = max(1, template["sets"] + LEVEL_SETS[level])
+    working_minutes = max(10, session_duration - WARM_UP_MINUTES - COOL_DOWN_MINUTES)
+    count = min(10, max(3, working_minutes // MINUTES_PER_EXERCISE))
+
+    # Only exercises suitable for the member's level and health conditions
+    allowed_levels = LEVELS[:LEVELS.index(level) + 1]
+    pool: dict[str, list[tuple[str, dict]]] = {}
+    for name, attributes in catalog.described():
+        if attributes.get("level", "beginner") not in allowed_levels:
+            continue
+        if conditions & set(attributes.get("avoid", [])):
+            continue
+        pool.setdefault(attributes.get("category", "strength"), []).append((name, attributes))
+    if not pool:
+        raise NoExercisesError("No catalog exercises suit this profile; a local plan cannot be built")
+
+    # Drop categories with nothing left to pick from and share their time out
+    mix = {category: share for category, share in category_mix(goal, preferences).items() if pool.get(category)}
+    if not mix:
+        mix = {category: 1.0 for category in pool}
+    total = sum(mix.values())
+    counts = split_count({category: share / total for category, share in mix.items()}, count)
+
+    # Same payload, same plan
+    seed = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+    rng = random.Random(seed)
+
+    days = []
+    for day, focus in zip(TRAINING_DAYS[days_per_week], DAY_FOCUS[days_per_week]):
+        exercises = []
+        for category, category_count in counts.items():
+            candidates = pool[category]
+            if category == "strength":
+                focused = [entry for entry in candidates if focus & set(entry[1].get("muscles", []))]
+                candidates = focused or candidates
+            for name, attributes in rng.sample(candidates, min(category_count, len(candidates))):
+                exercises.append({
+                    "name": name,
+                    "duration": f"{working_minutes // count} minutes",
+                    "repetitions": repetitions(category, template),
+                    "sets": str(sets),
+                    "rest": f"{template['rest']} seconds",
+                    "equipment": attributes.get("equipment", "None")
+                })
+        days.append({
+            "day": day,
+            "warm_up": f"{WARM_UP_MINUTES} minutes of light cardio and mobility",
+            "exercises": exercises,
+            "cool_down": f"{COOL_DOWN_MINUTES} minutes of stretching"
+        })
+
+    title = goal.replace("_", " ").title()
+    notes = []
+    if conditions:
+        notes.append("Exercises unsuitable for " + ", ".join(sorted(c.replace("_", " ") for c in conditions)) +
+                     " were left out; check with a health professional before starting.")
+    return {
+        "result": {
+            "goal": goal,
+            "fitness_level": level,
+            "total_weeks": payload.get("plan_duration_weeks", 4),
+            "schedule": {"days_per_week": days_per_week, "session_duration": session_duration},
+            "exercises": days,
+            "health_notes": notes,
+            "seo_title": f"{title} Workout Plan",
+            "seo_content": f"A {days_per_week}-day {level} plan for {title.lower()}, "
+                           f"{session_duration} minutes per session."
+        },
+        "source": "local"
+    }
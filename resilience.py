@@ -0,0 +1,494 @@
+from typing import Optional
+from collections import deque
+from email.utils import parsedate_to_datetime
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+
+
+class UpstreamError(Exception):
+    """Failed upstream request, carrying what is needed to decide on a retry"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+    @property
+    def unhealthy(self) -> bool:
+        """Whether the failure points at an unhealthy upstream: any 5xx, or a retryable failure"""
+        return self.retryable or (self.status_code is not None and self.status_code >= 500)
+
+
+class RetryBudget:
+    """Limit retries to a fraction of recent requests
+
+    Every request deposits `ratio` tokens and every retry withdraws one, so
+    retries can never exceed roughly ratio * requests (plus a small reserve
+    of `min_tokens`) even when the upstream is failing hard.
+    """
+
+    def __init__(self, ratio: float, min_tokens: float, max_tokens: Optional[float] = None):
+        self.ratio = ratio
+        self.max_tokens = max_tokens if max_tokens is not None else max(
+            min_tokens, 100 * ratio)
+        self.tokens = min_tokens
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        """Credit the budget for one original request"""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """Withdraw one retry from the budget; returns False when exhausted"""
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def refund(self) -> None:
+        """Return a withdrawal that ended up not being used"""
+        self.tokens = min(self.max_tokens, self.tokens + 1)
+        self.retries -= 1
+
+    def stats(self) -> dict:
+        """Return budget counters"""
+        return {
+            "tokens": round(self.tokens, 2),
+            "retries": self.retries,
+            "exhausted": self.exhausted
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Capped exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class DeadlineExceeded(UpstreamError):
+    """Raised when a request runs out of time before or while calling the upstream"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised instead of calling the upstream while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one upstream endpoint
+
+    The circuit opens after `failure_threshold` consecutive failures. While
+    open, calls fail fast until `recovery_timeout` seconds have passed; then
+    up to `half_open_max_calls` trial calls are let through. A successful
+    trial closes the circuit again, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self.half_open_calls = 0
+        return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit will admit a trial call"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go upstream now"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self.half_open_calls < self.half_open_max_calls:
+            self.half_open_calls += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Record a call that reached a healthy upstream"""
+        self.consecutive_failures = 0
+        if self._state != self.CLOSED:
+            self._state = self.CLOSED
+            self.half_open_calls = 0
+
+    def record_failure(self) -> None:
+        """Record a call that failed because the upstream is unhealthy"""
+        self.consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.half_open_calls = 0
+
+    def release(self) -> None:
+        """Give back a half-open trial slot for a call that never completed"""
+        if self._state == self.HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def stats(self) -> dict:
+        """Return breaker state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in": round(self.retry_in(), 2)
+        }
+
+
+class RateLimitExceeded(UpstreamError):
+    """Raised when a request would wait longer than allowed for a rate limit token"""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter with a bounded FIFO wait
+
+    Callers reserve a token up front, so waiters are served in arrival order
+    and the wait for the next caller is known before it queues. Callers that
+    would wait longer than max_wait are shed immediately.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waiting = 0
+        self.acquired = 0
+        self.shed = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Seconds a new caller would currently have to wait for a token"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self, max_wait: float) -> None:
+        """Take one token, waiting up to max_wait seconds; raises RateLimitExceeded otherwise"""
+        wait = self.wait_time()
+        if wait > max_wait:
+            self.shed += 1
+            raise RateLimitExceeded(
+                f"Rate limit queue full (estimated wait {wait:.1f}s); request shed")
+
+        self.tokens -= 1
+        self.acquired += 1
+        if wait <= 0:
+            return
+
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except BaseException:
+            # Give the reserved token back if the caller stops waiting
+            self.tokens += 1
+            self.acquired -= 1
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        """Return a token taken by acquire() that was not used"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+        self.acquired -= 1
+
+    def stats(self) -> dict:
+        """Return limiter state and counters"""
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "queue_depth": self.waiting,
+            "wait_seconds": round(self.wait_time(), 3),
+            "acquired": self.acquired,
+            "shed": self.shed
+        }
+
+
+class SharedTokenBucket:
+    """Token-bucket rate limiter whose state lives in SQLite, shared by worker processes
+
+    Behaves like TokenBucket, but the token count is read, refilled and
+    decremented in one write transaction on a WAL-mode database, so every
+    process using the same path and name draws from the same bucket. The
+    transactions run in a worker thread, since waiting for another process
+    to release the write lock would otherwise stall the event loop. Queue
+    depth and counters are per process.
+    """
+
+    def __init__(self, path: str, name: str, rate: float, capacity: float):
+        self.path = path
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.waiting = 0
+        self.acquired = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+        self._returns: set[asyncio.Task] = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "name TEXT PRIMARY KEY, "
+            "tokens REAL NOT NULL, "
+            "updated_at REAL NOT NULL)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+            (name, capacity, time.time()))
+        # Separate connection for reads, which never wait on writers in WAL mode
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+    def _update(self, take: bool, max_wait: float = 0.0) -> float:
+        """Refill the shared bucket, then take a token (if the wait is within max_wait) or return one
+
+        Returns the wait for the token taken, or the wait a new caller would
+        face when nothing was taken.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated_at = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+                now = time.time()
+                tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if take and wait <= max_wait:
+                    tokens -= 1
+                elif not take:
+                    tokens = min(self.capacity, tokens + 1)
+                self._conn.execute(
+                    "UPDATE rate_limits SET tokens = ?, updated_at = ? WHERE name = ?",
+                    (tokens, now, self.name))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def wait_time(self) -> float:
+        """Seconds a new caller would currently have to wait for a token"""
+        tokens, updated_at = self._reader.execute(
+            "SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+        tokens = min(self.capacity, tokens + max(0.0, time.time() - updated_at) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    async def acquire(self, max_wait: float) -> None:
+        """Take one token, waiting up to max_wait seconds; raises RateLimitExceeded otherwise"""
+        update = asyncio.ensure_future(asyncio.to_thread(self._update, True, max_wait))
+        try:
+            wait = await asyncio.shield(update)
+        except asyncio.CancelledError:
+            # The transaction still finishes; give back any token it takes
+            def return_taken(done: asyncio.Future) -> None:
+                if not done.cancelled() and done.exception() is None and done.result() <= max_wait:
+                    self._return_token()
+
+            update.add_done_callback(return_taken)
+            raise
+        if wait > max_wait:
+            self.shed += 1
+            raise RateLimitExceeded(
+                f"Rate limit queue full (estimated wait {wait:.1f}s); request shed")
+
+        self.acquired += 1
+        if wait <= 0:
+            return
+
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except BaseException:
+            # Give the reserved token back if the caller stops waiting
+            self.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        """Return a token taken by acquire() that was not used"""
+        self._return_token()
+        self.acquired -= 1
+
+    def _return_token(self) -> None:
+        """Put a token back in the shared bucket, off the event loop when one is running"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._update(take=False)
+            return
+        task = loop.create_task(asyncio.to_thread(self._update, False))
+        self._returns.add(task)
+        task.add_done_callback(self._returns.discard)
+
+    def stats(self) -> dict:
+        """Return limiter state and counters"""
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "shared": True,
+            "queue_depth": self.waiting,
+            "wait_seconds": round(self.wait_time(), 3),
+            "acquired": self.acquired,
+            "shed": self.shed
+        }
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter driven by observed latency and errors
+
+    The in-flight limit grows by roughly one per window of successful calls
+    while the limit is actually in use, and is cut by `backoff_ratio`
+    whenever a call fails with an overload signal (timeout, 429, 5xx) or the
+    short-term average latency rises above `latency_tolerance` times the
+    long-term average. Comparing smoothed averages rather than single
+    samples keeps normal latency jitter from shrinking the limit. Callers
+    beyond the limit wait in FIFO order.
+    """
+
+    SHORT_SMOOTHING = 0.2
+    LONG_SMOOTHING = 0.01
+
+    def __init__(self, initial_limit: float, min_limit: float, max_limit: float,
+                 latency_tolerance: float = 2.0, backoff_ratio: float = 0.9):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self.increases = 0
+        self.decreases = 0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    async def acquire(self) -> None:
+        """Wait for an in-flight slot"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller gave up
+                self.release()
+            elif waiter in self._waiters:
+                # release() may already have popped and skipped it
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False) -> None:
+        """Free a slot and, if a sample is given, adjust the limit"""
+        # Whether the limit was the constraint for this call
+        saturated = self.in_flight >= self.limit / 2
+        self.in_flight -= 1
+
+        if dropped:
+            self._decrease()
+        elif latency is not None:
+            if self.short_latency is None:
+                self.short_latency = self.long_latency = latency
+            else:
+                self.short_latency += self.SHORT_SMOOTHING * (latency - self.short_latency)
+                self.long_latency += self.LONG_SMOOTHING * (latency - self.long_latency)
+
+            if self.short_latency > self.long_latency * self.latency_tolerance:
+                self._decrease()
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _decrease(self) -> None:
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        self.decreases += 1
+
+    def stats(self) -> dict:
+        """Return limiter state and counters"""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "short_latency": round(self.short_latency, 4) if self.short_latency is not None else None,
+            "long_latency": round(self.long_latency, 4) if self.long_latency is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for percentile estimates"""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the pct-th percentile of recent samples, or None if there are none"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
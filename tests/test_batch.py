@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+import gym
+
+
+def run_batch(profiles: list) -> dict:
+    return asyncio.run(gym.generateWorkoutPlansBatch(
+        profiles=profiles, cache_mode="bypass", plan_source="local"))
+
+
+@pytest.mark.parametrize("profile, error", [
+    ({"days_per_week": "3"}, "days_per_week must be an integer"),
+    ({"preferences": ["cardio", 3]}, "preferences must be a list of strings"),
+    ({"health_conditions": "knee_injury"}, "health_conditions must be a list of strings"),
+    ({"goal": 5}, "goal must be a string"),
+])
+def test_badly_typed_profiles_do_not_fail_the_batch(profile, error):
+    batch = run_batch([profile, {"goal": "muscle_gain", "days_per_week": 4}])
+    invalid, valid = batch["results"]
+    assert invalid == {"index": 0, "error": error, "status": "validation_error"}
+    assert "result" in valid
+    assert batch["succeeded"] == 1
+    assert batch["failed"] == 1
+
+
+def test_unknown_cache_mode_is_rejected_for_local_plans():
+    result = asyncio.run(gym.generateWorkoutPlan(cache_mode="bogus", plan_source="local"))
+    assert result["status"] == "validation_error"
+    assert "cache_mode" in result["error"]
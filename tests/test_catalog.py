@@ -0,0 +1,65 @@
+import os
+
+from catalog import ExerciseCatalog
+
+SEED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exercise_catalog.json")
+
+
+def seeded_catalog(**kwargs) -> ExerciseCatalog:
+    catalog = ExerciseCatalog(**kwargs)
+    catalog.load_seed(SEED_PATH)
+    return catalog
+
+
+def test_typos_resolve_to_the_seeded_exercise():
+    catalog = seeded_catalog()
+    assert catalog.resolve("push ups") == "Push-ups"
+    assert catalog.resolve("psuh ups") == "Push-ups"
+    assert catalog.resolve("sqauts") == "Squats"
+    assert catalog.resolve("lat pulldwon") == catalog.resolve("lat pulldown")
+
+
+def test_different_exercises_are_not_merged():
+    catalog = seeded_catalog()
+    assert catalog.resolve("jump squat") == "Jump squat"
+    assert catalog.resolve("decline push-ups") == "Decline push-ups"
+
+
+def test_names_differing_by_a_digit_stay_distinct():
+    catalog = seeded_catalog()
+    for index in range(200):
+        name = f"exercise-{index}"
+        assert catalog.resolve(name) == f"Exercise-{index}"
+        catalog.learn(name, {"result": {"exercise_name": f"Exercise-{index}"}})
+    assert catalog.resolve("exercise-7") == "Exercise-7"
+    assert catalog.resolve("exercise-150") == "Exercise-150"
+
+
+def test_learn_only_records_names_returned_by_the_api():
+    catalog = seeded_catalog()
+    size = len(catalog)
+    catalog.learn("made up move", {"result": {}})
+    catalog.learn("another move", {"error": "not found"})
+    assert len(catalog) == size
+    assert catalog.lookup("made up move") is None
+
+    catalog.learn("cable fly", {"result": {"exercise_name": "Cable Flyes"}})
+    assert catalog.lookup("cable fly") == "Cable Flyes"
+
+
+def test_learned_names_are_capped():
+    catalog = seeded_catalog(max_learned=10)
+    for index in range(50):
+        catalog.learn(f"move {index}", {"result": {"exercise_name": f"Move {index}"}})
+    assert catalog.stats()["learned"] <= 10
+    assert catalog.lookup("Move 40") is None
+
+
+def test_distinct_movements_keep_their_own_names():
+    catalog = seeded_catalog()
+    assert catalog.resolve("back squats") == "Back Squats"
+    assert catalog.resolve("barbell squats") != "Squats"
+    assert catalog.resolve("split squats") == "Split Squats"
+    assert catalog.resolve("dumbbell press") != "Dumbbell Bench Press"
+    assert catalog.resolve("barbell curls") == "Barbell Curls"
+    assert catalog.resolve("hanging leg raises") == "Hanging Leg Raises"
@@ -0,0 +1,32 @@
+import pytest
+
+from nutrition import nutrition_profile, nutrition_targets
+
+
+def test_mifflin_st_jeor_when_height_age_and_sex_are_known():
+    targets = nutrition_targets(nutrition_profile(
+        current_weight=80, height_cm=180, age=30, sex="Male", daily_activity_level="sedentary"))
+    assert targets["bmr_method"] == "mifflin_st_jeor"
+    assert targets["bmr"] == 1780
+    assert targets["tdee"] == round(1780 * 1.2)
+
+
+def test_per_kg_estimate_when_details_are_missing():
+    targets = nutrition_targets(nutrition_profile(current_weight=80, height_cm=180))
+    assert targets["bmr_method"] == "weight_estimate"
+    assert targets["bmr"] == 1760
+
+
+def test_keto_caps_carbs_and_moves_the_energy_to_fat():
+    plain = nutrition_targets(nutrition_profile(current_weight=80))
+    keto = nutrition_targets(nutrition_profile(current_weight=80, dietary_restrictions=["Keto"]))
+    assert keto["macros"]["carbs_g"] == 30
+    assert keto["macros"]["fat_g"] > plain["macros"]["fat_g"]
+    assert keto["calories"] == plain["calories"]
+
+
+@pytest.mark.parametrize("field", ["current_weight", "target_weight", "height_cm", "age"])
+@pytest.mark.parametrize("value", ["80", True])
+def test_non_numeric_inputs_are_rejected(field, value):
+    with pytest.raises(ValueError, match=f"{field} must be a number"):
+        nutrition_profile(**{field: value})
@@ -0,0 +1,23 @@
+import gym
+
+
+def test_lang_keeps_its_hyphen():
+    assert gym.normalize_payload({"lang": " pt-BR "})["lang"] == "pt-br"
+
+
+def test_custom_goals_are_only_trimmed_deduplicated_and_sorted():
+    payload = gym.normalize_payload(
+        {"custom_goals": ["  Run a 5K in May", "Lose 5kg", "Lose 5kg ", ""]})
+    assert payload["custom_goals"] == ["Lose 5kg", "Run a 5K in May"]
+
+
+def test_equivalent_inputs_share_a_request_key():
+    endpoint = "/generateWorkoutPlan?noqueue=1"
+    first = {"goal": "Muscle Gain", "fitness_level": "Beginner",
+             "preferences": ["Strength Training", "cardio", "cardio"],
+             "health_conditions": ["Knee Injury"], "lang": "EN"}
+    second = {"goal": "muscle_gain", "fitness_level": "beginner",
+              "preferences": ["cardio", "strength_training"],
+              "health_conditions": ["knee_injury", " "], "lang": "en"}
+    assert (gym.request_key(endpoint, gym.normalize_payload(first))
+            == gym.request_key(endpoint, gym.normalize_payload(second)))
@@ -0,0 +1,43 @@
+import pytest
+
+from catalog import ExerciseCatalog
+from plan_engine import NoExercisesError, build_plan
+
+
+def small_catalog() -> ExerciseCatalog:
+    catalog = ExerciseCatalog()
+    catalog.add("Squats", attributes={"category": "strength", "muscles": ["legs"], "avoid": ["knee_injury"]})
+    catalog.add("Push-ups", attributes={"category": "strength", "muscles": ["chest"], "avoid": []})
+    catalog.add("Running", attributes={"category": "cardio", "muscles": ["legs"], "avoid": ["knee_injury"]})
+    catalog.add("Plank", attributes={"category": "core", "muscles": ["core"], "avoid": []})
+    return catalog
+
+
+def planned_names(plan: dict) -> set[str]:
+    return {exercise["name"] for day in plan["result"]["exercises"] for exercise in day["exercises"]}
+
+
+def test_health_conditions_exclude_unsuitable_exercises():
+    payload = {"goal": "general_fitness", "health_conditions": ["Bad Knees"],
+               "schedule": {"days_per_week": 3, "session_duration": 60}}
+    plan = build_plan(payload, small_catalog())
+    names = planned_names(plan)
+    assert names and not names & {"Squats", "Running"}
+    assert "knee injury" in plan["result"]["health_notes"][0]
+
+
+def test_same_payload_builds_the_same_plan():
+    payload = {"goal": "weight_loss", "schedule": {"days_per_week": 4, "session_duration": 45}}
+    assert build_plan(payload, small_catalog()) == build_plan(payload, small_catalog())
+
+
+def test_empty_catalog_raises():
+    with pytest.raises(NoExercisesError):
+        build_plan({"goal": "muscle_gain"}, ExerciseCatalog())
+
+
+def test_no_suitable_exercises_raises():
+    catalog = ExerciseCatalog()
+    catalog.add("Squats", attributes={"category": "strength", "avoid": ["knee_injury"]})
+    with pytest.raises(NoExercisesError):
+        build_plan({"health_conditions": ["knee_injury"]}, catalog)
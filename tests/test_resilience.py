@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from resilience import (AdaptiveLimiter, CircuitBreaker, RateLimitExceeded, RetryBudget,
+                        SharedTokenBucket, TokenBucket)
+
+
+def test_retry_budget_allows_a_fraction_of_requests():
+    budget = RetryBudget(ratio=0.25, min_tokens=0)
+    for _ in range(8):
+        budget.record_request()
+    assert [budget.try_acquire() for _ in range(3)] == [True, True, False]
+    assert budget.exhausted == 1
+
+
+def test_circuit_breaker_opens_then_recovers_through_half_open(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, half_open_max_calls=1)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow_request()
+
+    now[0] += 10
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+
+    now[0] += 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+
+
+def test_circuit_breaker_release_frees_the_half_open_slot(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, half_open_max_calls=1)
+    breaker.record_failure()
+    now[0] += 5
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_token_bucket_sheds_callers_beyond_max_wait():
+    bucket = TokenBucket(rate=10, capacity=1)
+
+    async def run():
+        await bucket.acquire(0)
+        with pytest.raises(RateLimitExceeded):
+            await bucket.acquire(0)
+        await bucket.acquire(1)
+
+    asyncio.run(run())
+    assert bucket.shed == 1 and bucket.acquired == 2
+
+
+def test_adaptive_limiter_caps_in_flight_calls_and_serves_waiters_in_order():
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1, max_limit=10)
+    peak = 0
+    order = []
+
+    async def call(index: int):
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        order.append(index)
+        await asyncio.sleep(0.01)
+        limiter.release(0.01)
+
+    async def run():
+        await asyncio.gather(*[call(index) for index in range(6)])
+
+    asyncio.run(run())
+    assert peak <= 2
+    assert order == list(range(6))
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_limiter_backs_off_on_drops_and_not_on_jitter():
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=1, max_limit=20)
+
+    async def run():
+        for latency in [0.1, 0.12, 0.09, 0.11] * 10:
+            await limiter.acquire()
+            limiter.release(latency)
+        assert limiter.decreases == 0
+
+        await limiter.acquire()
+        limiter.release(0.1, dropped=True)
+
+    asyncio.run(run())
+    assert limiter.decreases == 1
+    assert limiter.limit == pytest.approx(9.0)
+
+
+def test_adaptive_limiter_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+        # Cancelled and released in the same loop iteration, before the waiter runs
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limiter.release(0.1)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+    asyncio.run(run())
+    assert limiter.in_flight == 1
+
+
+def test_shared_token_bucket_is_shared_and_returns_tokens(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    first = SharedTokenBucket(path, "key", rate=1, capacity=2)
+    second = SharedTokenBucket(path, "key", rate=1, capacity=2)
+
+    async def run():
+        await first.acquire(0)
+        await second.acquire(0)
+        with pytest.raises(RateLimitExceeded):
+            await first.acquire(0)
+        second.release()
+        await asyncio.gather(*second._returns)
+        await first.acquire(0)
+
+    asyncio.run(run())
+    assert first.acquired == 2 and second.acquired == 0
+
+
+def test_shared_token_bucket_waits_for_the_lock_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    bucket = SharedTokenBucket(path, "key", rate=10, capacity=10)
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        acquire = asyncio.ensure_future(bucket.acquire(1))
+        await asyncio.sleep(0.3)
+        other_process.execute("COMMIT")
+        await acquire
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
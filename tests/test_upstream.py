@@ -0,0 +1,241 @@
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+import gym
+import mock_upstream
+from resilience import CircuitOpenError, DeadlineExceeded, UpstreamError
+
+ENDPOINT = "/exerciseDetails?noqueue=1"
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Point gym at an in-process mock upstream with fresh resilience state"""
+    config = mock_upstream.MockConfig(mock_upstream.parse_args(
+        ["--latency-dist", "constant", "--latency-ms", "10", "--seed", "1"]))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_upstream.create_app(config)))
+    monkeypatch.setattr(gym, "http_client", client)
+    monkeypatch.setattr(gym, "RAPID_APIKEY", "test")
+    monkeypatch.setattr(gym, "BASE_URL", "http://mock")
+    monkeypatch.setattr(gym, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(gym, "RETRY_MAX_DELAY", 0.05)
+    monkeypatch.setattr(gym, "RATE_LIMIT_KEY_RPS", 0)
+    for state in ("retry_budgets", "circuit_breakers", "rate_limiters",
+                  "concurrency_limiters", "latency_trackers"):
+        monkeypatch.setattr(gym, state, {})
+    return config
+
+
+def fail_with(config, *statuses: int) -> None:
+    config.error_rate = 1.0
+    config.error_statuses = list(statuses)
+
+
+def fail_first(config, status: int, failures: int) -> None:
+    """Make the mock answer `status` to the next `failures` requests, then succeed"""
+    config.error_rate = 0.5
+    config.error_statuses = [status]
+    draws = iter([0.0] * failures)
+    config.random.random = lambda: next(draws, 1.0)
+
+
+def fetch(payload=None) -> dict:
+    return asyncio.run(gym.fetch_upstream(ENDPOINT, payload or {"exercise_name": "Squats"}))
+
+
+def test_transient_failures_are_retried(upstream):
+    fail_first(upstream, 503, 2)
+    assert fetch()["result"]["exercise_name"] == "Squats"
+    assert upstream.calls["/exerciseDetails"] == 3
+
+
+def test_retries_stop_at_max_attempts(upstream):
+    fail_with(upstream, 503)
+    with pytest.raises(UpstreamError):
+        fetch()
+    assert upstream.calls["/exerciseDetails"] == gym.RETRY_MAX_ATTEMPTS
+
+
+@pytest.mark.parametrize("status", [400, 500])
+def test_non_transient_failures_are_not_retried(upstream, status):
+    fail_with(upstream, status)
+    with pytest.raises(UpstreamError) as error:
+        fetch()
+    assert error.value.status_code == status
+    assert upstream.calls["/exerciseDetails"] == 1
+
+
+def test_retries_stop_when_the_budget_is_exhausted(upstream, monkeypatch):
+    monkeypatch.setattr(gym, "RETRY_BUDGET_MIN", 0)
+    monkeypatch.setattr(gym, "RETRY_BUDGET_RATIO", 0)
+    fail_with(upstream, 503)
+    with pytest.raises(UpstreamError):
+        fetch()
+    assert upstream.calls["/exerciseDetails"] == 1
+    assert gym.get_retry_budget(ENDPOINT).exhausted == 1
+
+
+def test_concurrent_identical_requests_share_one_upstream_call(upstream, monkeypatch):
+    monkeypatch.setattr(gym, "response_cache", gym.ResponseCache(1024 * 1024, 100))
+    monkeypatch.setattr(gym, "single_flight", gym.SingleFlight())
+    monkeypatch.setattr(gym, "disk_cache", None)
+
+    async def run():
+        return await asyncio.gather(*[
+            gym.make_api_request(ENDPOINT, {"exercise_name": "Squats"}, "bypass") for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert all(result == results[0] for result in results)
+    assert upstream.calls["/exerciseDetails"] == 1
+    assert gym.single_flight.followers == 4
+
+
+def test_server_errors_shrink_the_concurrency_limit(upstream):
+    fail_with(upstream, 500)
+    with pytest.raises(UpstreamError):
+        fetch()
+    limiter = gym.get_concurrency_limiter(ENDPOINT)
+    assert limiter.limit < gym.ADAPTIVE_CONCURRENCY_INITIAL
+    assert limiter.in_flight == 0
+
+
+def test_server_errors_open_the_circuit(upstream):
+    fail_with(upstream, 500)
+
+    async def run():
+        errors = []
+        for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD + 3):
+            try:
+                await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+            except (UpstreamError, CircuitOpenError) as e:
+                errors.append(type(e))
+        return errors
+
+    errors = asyncio.run(run())
+    breaker = gym.get_circuit_breaker(ENDPOINT)
+    assert breaker.state == breaker.OPEN
+    assert errors.count(CircuitOpenError) == 3
+    assert upstream.calls["/exerciseDetails"] == gym.CIRCUIT_FAILURE_THRESHOLD
+
+
+def test_client_errors_do_not_open_the_circuit(upstream):
+    fail_with(upstream, 400)
+
+    async def run():
+        for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD + 1):
+            with pytest.raises(UpstreamError):
+                await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+
+    asyncio.run(run())
+    assert gym.get_circuit_breaker(ENDPOINT).state == "closed"
+
+
+def test_open_circuit_fails_fast_without_spending_rate_limit_tokens(upstream, monkeypatch):
+    monkeypatch.setattr(gym, "RATE_LIMIT_KEY_RPS", 1)
+    monkeypatch.setattr(gym, "RATE_LIMIT_KEY_BURST", 1)
+    breaker = gym.get_circuit_breaker(ENDPOINT)
+    for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(4):
+            with pytest.raises(CircuitOpenError):
+                await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert all(limiter.acquired == 0 for limiter in gym.get_rate_limiters(ENDPOINT))
+    assert upstream.calls["/exerciseDetails"] == 0
+
+
+
+@pytest.fixture
+def slow_upstream(upstream, monkeypatch):
+    """Serve the mock upstream on a real socket, where client timeouts actually fire"""
+    upstream.latency_ms = 300
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(
+        mock_upstream.create_app(upstream), log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    monkeypatch.setattr(gym, "http_client", None)
+    monkeypatch.setattr(gym, "BASE_URL", f"http://127.0.0.1:{sock.getsockname()[1]}")
+    yield upstream
+    server.should_exit = True
+    thread.join()
+
+
+def test_deadline_timeouts_do_not_trip_the_circuit_or_shrink_the_limit(slow_upstream):
+    async def run():
+        for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD + 1):
+            token = gym.request_deadline.set(time.monotonic() + 0.1)
+            try:
+                with pytest.raises(DeadlineExceeded):
+                    await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+            finally:
+                gym.request_deadline.reset(token)
+        result = await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+        await gym.http_client.aclose()
+        return result
+
+    assert asyncio.run(run())["result"]["exercise_name"] == "Squats"
+    assert gym.get_circuit_breaker(ENDPOINT).state == "closed"
+    limiter = gym.get_concurrency_limiter(ENDPOINT)
+    assert limiter.limit == gym.ADAPTIVE_CONCURRENCY_INITIAL
+    assert limiter.in_flight == 0
+
+
+def test_deadline_passing_before_the_call_frees_the_half_open_slot(upstream, monkeypatch):
+    monkeypatch.setattr(gym, "CIRCUIT_RECOVERY_TIMEOUT", 0)
+    breaker = gym.get_circuit_breaker(ENDPOINT)
+    for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    async def slow_rate_limit(endpoint, max_wait):
+        await asyncio.sleep(max_wait + 0.01)
+
+    monkeypatch.setattr(gym, "acquire_rate_limit", slow_rate_limit)
+
+    async def run():
+        token = gym.request_deadline.set(time.monotonic() + 0.05)
+        try:
+            with pytest.raises(DeadlineExceeded):
+                await gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"})
+        finally:
+            gym.request_deadline.reset(token)
+
+    asyncio.run(run())
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.half_open_calls == 0
+    assert upstream.calls["/exerciseDetails"] == 0
+
+
+def test_hung_upstream_opens_the_circuit_under_short_deadlines(slow_upstream, monkeypatch):
+    slow_upstream.latency_ms = 2000
+    monkeypatch.setattr(gym, "DEADLINE_FAILURE_MIN_WAIT", 0.2)
+    monkeypatch.setitem(gym.TOOL_TIMEOUTS, "exerciseDetail", 0.3)
+
+    async def run():
+        for _ in range(gym.CIRCUIT_FAILURE_THRESHOLD):
+            with pytest.raises(UpstreamError) as error:
+                await gym.with_deadline(
+                    "exerciseDetail", None, gym.fetch_upstream(ENDPOINT, {"exercise_name": "Squats"}))
+            assert not isinstance(error.value, DeadlineExceeded)
+        await gym.http_client.aclose()
+
+    asyncio.run(run())
+    assert gym.get_circuit_breaker(ENDPOINT).state == "open"
+    limiter = gym.get_concurrency_limiter(ENDPOINT)
+    assert limiter.limit < gym.ADAPTIVE_CONCURRENCY_INITIAL
+    assert limiter.in_flight == 0
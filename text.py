@@ -0,0 +1,8 @@
+"""Text helpers shared by the server and the local engines."""
+
+import re
+
+
+def snake_case(value: str) -> str:
+    """Lower-case a value and join its words with underscores"""
+    return re.sub(r"[\s\-]+", "_", value.strip().lower()).strip("_")
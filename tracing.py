@@ -0,0 +1,270 @@
+"""Minimal tracing with OpenTelemetry-compatible JSON export.
+
+Spans are written as OTLP/JSON `resourceSpans` documents, one per line, to
+the file named by GYM_TRACE_FILE, so they can be loaded by any OTLP-aware
+tool. Finished spans are handed to a background writer thread, so file I/O
+never runs on the event loop; batches are dropped if the writer falls far
+behind. Trace context crosses the MCP stdio boundary as a W3C `traceparent`
+in the tool call's `_meta`. With no trace file configured every span is a
+no-op.
+"""
+
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import functools
+import inspect
+import json
+import queue
+import secrets
+import threading
+import time
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str,
+                 attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def traceparent(self) -> str:
+        """W3C traceparent header value identifying this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class NoopSpan:
+    """Stand-in span used while tracing is disabled"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str]]:
+    """Return (trace_id, parent_span_id) from a W3C traceparent, or None if invalid"""
+    if not isinstance(value, str):
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Tracer:
+    """Creates spans and exports finished ones to an OTLP/JSON lines file"""
+
+    def __init__(self, service_name: str, path: Optional[str], batch_size: int = 50,
+                 max_pending_batches: int = 1000):
+        self.service_name = service_name
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._current: ContextVar[Optional[Span]] = ContextVar(
+            f"{service_name}_current_span", default=None)
+        self._finished: list[Span] = []
+        self._lock = threading.Lock()
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending_batches)
+        self._writer: Optional[threading.Thread] = None
+        if path:
+            atexit.register(self.flush)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def current_span(self):
+        """Return the active span, or a no-op span if there is none"""
+        return self._current.get() or NOOP_SPAN
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", attributes: Optional[dict] = None,
+             traceparent: Optional[str] = None) -> Iterator:
+        """Run the enclosed block in a new span
+
+        The span's parent is the active span, or the remote span identified
+        by `traceparent` when there is no active one.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = self._current.get()
+        remote = parse_traceparent(traceparent)
+        if parent:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif remote:
+            trace_id, parent_id = remote
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+
+        span = Span(name, trace_id, parent_id, kind, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self._current.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span, local_root=parent is None)
+
+    def _finish(self, span: Span, local_root: bool) -> None:
+        with self._lock:
+            self._finished.append(span)
+            if not local_root and len(self._finished) < self.batch_size:
+                return
+            spans, self._finished = self._finished, []
+        self._submit(spans)
+
+    def _submit(self, spans: list[Span]) -> None:
+        """Queue spans for the writer thread, starting it on first use"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                self._writer.start()
+        try:
+            self._pending.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _write_loop(self) -> None:
+        while True:
+            spans = self._pending.get()
+            try:
+                self._write(spans)
+            except OSError:
+                self.dropped += len(spans)
+            finally:
+                self._pending.task_done()
+
+    def flush(self) -> None:
+        """Queue buffered spans and wait until the writer has written everything"""
+        with self._lock:
+            spans, self._finished = self._finished, []
+        if not self.path:
+            return
+        if spans:
+            self._submit(spans)
+        self._pending.join()
+
+    def _write(self, spans: list[Span]) -> None:
+        """Append spans to the trace file as one OTLP/JSON document"""
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "gym.tracing"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(document, separators=(",", ":")) + "\n")
+
+    def trace_tool(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Decorator running an MCP tool in a server span, continuing the caller's trace"""
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            traceparent = None
+            ctx = kwargs.get("ctx")
+            if ctx is not None:
+                try:
+                    meta = ctx.request_context.meta
+                    traceparent = getattr(meta, "traceparent", None) if meta else None
+                except ValueError:
+                    pass
+
+            with self.span(f"tool {fn.__name__}", kind="server", traceparent=traceparent) as span:
+                result = await fn(*args, **kwargs)
+                if isinstance(result, dict) and "error" in result:
+                    span.set_attribute("gym.status", result.get("status", "error"))
+                    span.set_error(str(result["error"]))
+                return result
+
+        return wrapper
+
+
+def instrument_mcp_client(tracer: Tracer) -> None:
+    """Trace MCP tool calls made through mcp.ClientSession and send the trace context along
+
+    mcp_use drives the MCP ClientSession internally, so call_tool is wrapped
+    in place to add a client span and a `traceparent` entry in `_meta`.
+    """
+    from mcp import ClientSession
+
+    if not tracer.enabled or getattr(ClientSession.call_tool, "__traced__", False):
+        return
+    if "meta" not in inspect.signature(ClientSession.call_tool).parameters:
+        # Older MCP SDKs cannot send _meta with a tool call
+        return
+
+    call_tool = ClientSession.call_tool
+
+    @functools.wraps(call_tool)
+    async def traced_call_tool(self, name, arguments=None, *args, meta=None, **kwargs):
+        with tracer.span(f"mcp.call_tool {name}", kind="client") as span:
+            meta = {**(meta or {}), "traceparent": span.traceparent()}
+            result = await call_tool(self, name, arguments, *args, meta=meta, **kwargs)
+            if getattr(result, "isError", False):
+                span.set_error("Tool returned an error")
+            return result
+
+    traced_call_tool.__traced__ = True
+    ClientSession.call_tool = traced_call_tool